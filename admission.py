@@ -0,0 +1,56 @@
+"""
+Admission - Server policy checks compiled per guild into integer-set predicates
+"""
+
+
+def id_set(values):
+    """Convert stored ID strings to a frozenset of ints, skipping malformed entries"""
+    return frozenset(int(value) for value in values if value.strip().isdigit())
+
+
+class Admission:
+    __slots__ = ('enabled', 'allowed_channels', 'blocked_channels', 'allowed_roles', 'blocked_roles',
+                 'check_roles', 'require_mention', 'admin_only', 'cooldown_seconds')
+
+    def __init__(self, policy):
+        self.enabled = policy['enabled']
+        self.allowed_channels = id_set(policy['allowed_channels'])
+        self.blocked_channels = id_set(policy['blocked_channels'])
+        self.allowed_roles = id_set(policy['allowed_roles'])
+        self.blocked_roles = id_set(policy['blocked_roles'])
+        self.check_roles = bool(self.allowed_roles or self.blocked_roles)  # Skip building role sets when unused
+        self.require_mention = policy['require_mention']
+        self.admin_only = policy['admin_only']
+        self.cooldown_seconds = policy['cooldown_seconds']
+
+    def check(self, message, mentioned):
+        """Get the reason a guild message is rejected, None if it's admitted"""
+        if not self.enabled:
+            return 'disabled'
+
+        channel_id = message.channel.id
+        if self.allowed_channels and channel_id not in self.allowed_channels:
+            return 'channel'
+        if channel_id in self.blocked_channels:
+            return 'channel'
+
+        if self.require_mention and not mentioned:
+            return 'mention_required'
+
+        # Role and permission checks walk the member's roles, so they run last
+        if self.check_roles:
+            user_roles = {role.id for role in message.author.roles}
+            if self.allowed_roles and self.allowed_roles.isdisjoint(user_roles):
+                return 'role'
+            if not self.blocked_roles.isdisjoint(user_roles):
+                return 'role'
+
+        if self.admin_only and not message.author.guild_permissions.administrator:
+            return 'admin_only'
+
+        return None
+
+
+def compile_admissions(policies):
+    """Compile a guild_id -> policy mapping into guild_id -> Admission"""
+    return {guild_id: Admission(policy) for guild_id, policy in policies.items()}
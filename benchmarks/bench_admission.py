@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Admission Benchmark - Messages filtered per second by compiled admission checks against the old check chain
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from admission import Admission
+
+BOT_ID = 4242
+
+# Server policies as parse_policy_row returns them, from open to heavily restricted
+POLICIES = {
+    'open': {
+        'enabled': True, 'allowed_channels': frozenset(), 'blocked_channels': frozenset(),
+        'allowed_roles': frozenset(), 'blocked_roles': frozenset(), 'cooldown_seconds': 5,
+        'max_message_length': 2000, 'require_mention': False, 'admin_only': False, 'response_cache': False
+    },
+    'channels': {
+        'enabled': True, 'allowed_channels': frozenset(str(100 + i) for i in range(10)),
+        'blocked_channels': frozenset({'105'}), 'allowed_roles': frozenset(), 'blocked_roles': frozenset(),
+        'cooldown_seconds': 5, 'max_message_length': 2000, 'require_mention': False, 'admin_only': False,
+        'response_cache': False
+    },
+    'roles': {
+        'enabled': True, 'allowed_channels': frozenset(), 'blocked_channels': frozenset(),
+        'allowed_roles': frozenset(str(i) for i in range(0, 40, 2)), 'blocked_roles': frozenset({'7', '9'}),
+        'cooldown_seconds': 5, 'max_message_length': 2000, 'require_mention': False, 'admin_only': False,
+        'response_cache': False
+    },
+    'mention_only': {
+        'enabled': True, 'allowed_channels': frozenset(str(100 + i) for i in range(10)),
+        'blocked_channels': frozenset(), 'allowed_roles': frozenset(str(i) for i in range(0, 40, 2)),
+        'blocked_roles': frozenset({'7'}), 'cooldown_seconds': 5, 'max_message_length': 2000,
+        'require_mention': True, 'admin_only': True, 'response_cache': False
+    }
+}
+
+
+class FakePermissions:
+    def __init__(self, administrator):
+        self.administrator = administrator
+
+
+class FakeRole:
+    def __init__(self, role_id):
+        self.id = role_id
+
+
+class FakeUser:
+    def __init__(self, user_id):
+        self.id = user_id
+
+
+class FakeMember:
+    def __init__(self, user_id, role_ids, administrator):
+        self.id = user_id
+        self.role_ids = role_ids
+        self.administrator = administrator
+
+    @property
+    def roles(self):
+        # discord.py builds the role list from the guild's cache on every access
+        return [FakeRole(role_id) for role_id in self.role_ids]
+
+    @property
+    def guild_permissions(self):
+        # discord.py folds every role's permissions together on every access
+        return FakePermissions(self.administrator or any(role.id == 0 for role in self.roles))
+
+
+class FakeChannel:
+    def __init__(self, channel_id):
+        self.id = channel_id
+
+
+class FakeMessage:
+    def __init__(self, channel, author, mentions):
+        self.channel = channel
+        self.author = author
+        self.mentions = mentions
+        self.mention_everyone = False
+
+
+def mentioned_in(message):
+    """Check a mention the way discord.py's User.mentioned_in does"""
+    if message.mention_everyone:
+        return True
+    return any(user.id == BOT_ID for user in message.mentions)
+
+
+def legacy_check(policy, message):
+    """The policy checks on_message ran before they were compiled"""
+    if not policy['enabled']:
+        return 'disabled'
+    if policy['admin_only'] and not message.author.guild_permissions.administrator:
+        return 'admin_only'
+    channel_id = str(message.channel.id)
+    if policy['allowed_channels'] and channel_id not in policy['allowed_channels']:
+        return 'channel'
+    if channel_id in policy['blocked_channels']:
+        return 'channel'
+    user_roles = {str(role.id) for role in message.author.roles}
+    if policy['allowed_roles'] and policy['allowed_roles'].isdisjoint(user_roles):
+        return 'role'
+    if not policy['blocked_roles'].isdisjoint(user_roles):
+        return 'role'
+    if policy['require_mention'] and not mentioned_in(message):
+        return 'mention_required'
+    return None
+
+
+def compiled_check(admission, message):
+    """The compiled admission check, with the mention test done once up front"""
+    return admission.check(message, mentioned_in(message))
+
+
+def make_messages(count, mention_rate, seed):
+    """Build synthetic guild messages across channels, members and roles"""
+    rng = random.Random(seed)
+    bot_user = FakeUser(BOT_ID)
+    messages = []
+    for i in range(count):
+        member = FakeMember(i, [rng.randrange(40) for _ in range(rng.randint(1, 8))], rng.random() < 0.05)
+        mentions = [FakeUser(rng.randrange(10000)) for _ in range(rng.randint(0, 2))]
+        if rng.random() < mention_rate:
+            mentions.append(bot_user)
+        messages.append(FakeMessage(FakeChannel(100 + rng.randrange(20)), member, mentions))
+    return messages
+
+
+def bench(check, policy, messages, rounds):
+    """Get messages filtered per second and the share that were admitted"""
+    admitted = sum(check(policy, message) is None for message in messages)
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for message in messages:
+            check(policy, message)
+    elapsed = time.perf_counter() - start
+    return len(messages) * rounds / elapsed, admitted / len(messages)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark message admission checks")
+    parser.add_argument('--messages', type=int, default=10000, help="Distinct synthetic messages")
+    parser.add_argument('--rounds', type=int, default=20, help="Passes over the messages per policy")
+    parser.add_argument('--mention-rate', type=float, default=0.3, help="Fraction of messages that mention the bot")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    messages = make_messages(args.messages, args.mention_rate, args.seed)
+
+    print(f"🚦 Admission checks ({args.messages} messages x {args.rounds} rounds)")
+    print(f"{'policy':<14} {'admitted':>9} {'legacy msg/s':>14} {'compiled msg/s':>15} {'speedup':>8}")
+    for name, policy in POLICIES.items():
+        legacy_rate, admitted = bench(legacy_check, policy, messages, args.rounds)
+        compiled_rate, compiled_admitted = bench(compiled_check, Admission(policy), messages, args.rounds)
+        assert admitted == compiled_admitted, f"{name}: compiled checks admit different messages"
+        print(f"{name:<14} {admitted*100:>8.1f}% {legacy_rate:>14,.0f} {compiled_rate:>15,.0f} "
+              f"{compiled_rate / legacy_rate:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
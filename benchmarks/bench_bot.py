@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+Bot Benchmark - Drive on_message with synthetic traffic against a fake Ollama server
+"""
+import argparse
+import asyncio
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, REPO_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from fake_ollama import FakeOllama, WORDS
+
+
+class FakeTyping:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+
+class FakeSentMessage:
+    def __init__(self, content, delay):
+        self.content = content
+        self.delay = delay
+
+    async def edit(self, content):
+        await asyncio.sleep(self.delay)
+        self.content = content
+
+
+class FakeChannel:
+    def __init__(self, channel_id, delay):
+        self.id = channel_id
+        self.delay = delay  # Simulated Discord API round trip
+
+    def typing(self):
+        return FakeTyping()
+
+    async def send(self, content):
+        await asyncio.sleep(self.delay)
+        return FakeSentMessage(content, self.delay)
+
+
+class FakePermissions:
+    administrator = False
+
+
+class FakeRole:
+    def __init__(self, role_id):
+        self.id = role_id
+
+
+class FakeMember:
+    def __init__(self, user_id):
+        self.id = user_id
+        self.display_name = f"user{user_id}"
+        self.roles = [FakeRole(user_id % 7)]
+        self.guild_permissions = FakePermissions()
+        self.bot = False
+
+
+class FakeGuild:
+    def __init__(self, guild_id):
+        self.id = guild_id
+
+
+class FakeMessage:
+    def __init__(self, guild, channel, author, content):
+        self.guild = guild
+        self.channel = channel
+        self.author = author
+        self.content = content
+        self.created = time.perf_counter()
+        self.replied = None  # perf_counter time of the first model reply
+
+    async def reply(self, content):
+        await asyncio.sleep(self.channel.delay)
+        # Busy and error notices don't count as answers
+        if self.replied is None and content.startswith(WORDS[0]):
+            self.replied = time.perf_counter()
+        return FakeSentMessage(content, self.channel.delay)
+
+
+class FakeBotUser:
+    id = 4242
+    display_name = "bench-bot"
+
+    def mentioned_in(self, message):
+        return f"<@{self.id}>" in message.content
+
+
+def percentile(values, q):
+    """Get the q-th quantile of sorted values"""
+    if not values:
+        return 0.0
+    return values[min(int(q * len(values)), len(values) - 1)]
+
+
+def format_counts(counter):
+    """Render a labelled counter as label=count pairs"""
+    if not counter.values:
+        return "none"
+    return ", ".join(f"{labels[0] if labels else 'total'}={value}" for labels, value in sorted(counter.values.items()))
+
+
+async def measure_loop_lag(samples, interval=0.01):
+    """Record how late the event loop wakes up, a stand-in for gateway heartbeat delay"""
+    loop = asyncio.get_event_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        samples.append(loop.time() - start - interval)
+
+
+async def run_benchmark(args):
+    fake = FakeOllama(args.latency, args.token_rate, args.tokens, args.load_time, args.ollama_parallel)
+    runner = await fake.start('127.0.0.1', args.port)
+
+    import bot as bot_module
+    import metrics
+    import tracing
+    bot = bot_module.bot
+    bot._connection.user = FakeBotUser()
+    await bot.setup_hook()
+
+    # Traffic starts once the bot is up, so a startup warm-up takes the cold load off the first replies
+    if bot.warmup_task is not None:
+        warmup_start = time.perf_counter()
+        await bot.warmup_task
+        print(f"🔥 Model warm-up took {time.perf_counter() - warmup_start:.2f}s")
+
+    # Spans give the per-stage breakdown, written once at the end
+    trace_path = os.path.abspath('bench_traces.jsonl')
+    tracing.tracer.configure(trace_path)
+
+    rng = random.Random(args.seed)
+    guilds = [FakeGuild(1000 + i) for i in range(args.guilds)]
+    channels = {guild.id: [FakeChannel(guild.id * 100 + c, args.discord_latency) for c in range(args.channels)]
+                for guild in guilds}
+    members = [FakeMember(i) for i in range(args.users)]
+    for guild in guilds:
+        await bot.update_server_policy(guild.id, cooldown_seconds=args.cooldown, response_cache=args.cache)
+
+    lag_samples = []
+    lag_task = asyncio.create_task(measure_loop_lag(lag_samples))
+    messages = []
+    tasks = []
+    interval = 1.0 / args.rate if args.rate > 0 else 0.0
+
+    print(f"🏁 {args.messages} messages across {args.guilds} guilds x {args.channels} channels, {args.users} users")
+    start = time.perf_counter()
+    for i in range(args.messages):
+        guild = rng.choice(guilds)
+        channel = rng.choice(channels[guild.id])
+        text = rng.choice(args.prompts)
+        mention = rng.random() < args.mention_rate
+        content = f"<@{FakeBotUser.id}> {text}" if mention else text
+        message = FakeMessage(guild, channel, rng.choice(members), content)
+        messages.append(message)
+        tasks.append(asyncio.create_task(bot.on_message(message)))
+        if interval:
+            await asyncio.sleep(interval)
+        elif i % 100 == 99:
+            await asyncio.sleep(0)
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - start
+
+    lag_task.cancel()
+    await bot.conversation_context.flush()
+    tracing.tracer.flush()
+    await bot.close()
+    await runner.cleanup()
+
+    latencies = sorted((message.replied - message.created) * 1000 for message in messages if message.replied)
+    lag = sorted(sample * 1000 for sample in lag_samples)
+
+    print()
+    print(f"⏱️  {elapsed:.2f}s total, {len(messages) / elapsed:.1f} msg/s handled, "
+          f"{len(latencies) / elapsed:.1f} answered/s ({len(latencies)} answered, {fake.requests} Ollama requests)")
+    print(f"💬 Reply latency ms: p50 {percentile(latencies, 0.5):.1f} | "
+          f"p95 {percentile(latencies, 0.95):.1f} | p99 {percentile(latencies, 0.99):.1f}")
+    print(f"📋 Replies {format_counts(metrics.REPLIES)} | Rejections {format_counts(metrics.REJECTIONS)} | "
+          f"Errors {format_counts(metrics.ERRORS)}")
+    print(f"💓 Event loop lag ms: p50 {percentile(lag, 0.5):.2f} | "
+          f"p99 {percentile(lag, 0.99):.2f} | max {lag[-1] if lag else 0.0:.2f}")
+    print()
+    print("🔬 Stage breakdown")
+    if os.path.exists(trace_path):
+        tracing.summarize(trace_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the bot's message path offline")
+    parser.add_argument('--messages', type=int, default=1000, help="Messages to send")
+    parser.add_argument('--rate', type=float, default=50.0, help="Messages per second, 0 sends them all at once")
+    parser.add_argument('--guilds', type=int, default=20)
+    parser.add_argument('--channels', type=int, default=5, help="Channels per guild")
+    parser.add_argument('--users', type=int, default=500)
+    parser.add_argument('--mention-rate', type=float, default=1.0, help="Fraction of messages that mention the bot")
+    parser.add_argument('--cooldown', type=int, default=0, help="Per-user cooldown seconds in every guild")
+    parser.add_argument('--cache', action='store_true', help="Enable the response cache in every guild")
+    parser.add_argument('--prompts', type=lambda value: value.split('|'),
+                        default="roast me|tell me a joke|what's up|roast my code|hello there".split('|'),
+                        help="Pipe separated prompts to pick from")
+    parser.add_argument('--latency', type=float, default=0.2, help="Fake Ollama seconds before the first token")
+    parser.add_argument('--token-rate', type=float, default=200.0, help="Fake Ollama tokens per second")
+    parser.add_argument('--tokens', type=int, default=40, help="Fake Ollama tokens per reply")
+    parser.add_argument('--ollama-parallel', type=int, default=0, help="Fake Ollama requests served at once")
+    parser.add_argument('--load-time', type=float, default=0.0, help="Fake Ollama seconds to load the model cold")
+    parser.add_argument('--no-warmup', action='store_true', help="Set OLLAMA_WARMUP=false")
+    parser.add_argument('--discord-latency', type=float, default=0.05, help="Simulated Discord API seconds per call")
+    parser.add_argument('--port', type=int, default=11435, help="Port for the fake Ollama server")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--stream', action='store_true', help="Set STREAM_RESPONSES=true")
+    parser.add_argument('--chat', action='store_true', help="Set OLLAMA_USE_CHAT=true")
+    args = parser.parse_args()
+
+    # The bot reads its settings at import, point it at the fake server
+    os.environ.setdefault('DISCORD_TOKEN', 'benchmark')
+    os.environ['OLLAMA_BASE_URL'] = f"http://127.0.0.1:{args.port}"
+    os.environ.pop('OLLAMA_BASE_URLS', None)
+    os.environ['STREAM_RESPONSES'] = 'true' if args.stream else 'false'
+    os.environ['OLLAMA_USE_CHAT'] = 'true' if args.chat else 'false'
+    os.environ['OLLAMA_WARMUP'] = 'false' if args.no_warmup else 'true'
+    for name in ('WORKER_ADDRESS', 'METRICS_PORT', 'TRACE_FILE', 'SHARD_COUNT', 'SHARD_IDS'):
+        os.environ.pop(name, None)
+
+    # Run in a scratch directory so the real bot_policies.db is never touched
+    workdir = tempfile.mkdtemp(prefix='bench_bot_')
+    policy_file = os.path.join(REPO_DIR, 'base_policy.txt')
+    if os.path.exists(policy_file):
+        shutil.copy(policy_file, workdir)
+    os.chdir(workdir)
+    try:
+        asyncio.run(run_benchmark(args))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Semantic Cache Benchmark - Index lookup cost against embedding and generation cost
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from semantic_cache import SemanticCache
+
+
+def bench_lookup(size, dim, queries, threshold):
+    """Fill a cache with random prompts and time lookups of perturbed copies"""
+    rng = np.random.default_rng(0)
+    cache = SemanticCache(max_size=size, threshold=threshold)
+    vectors = rng.standard_normal((size, dim)).astype(np.float32)
+    for i, vector in enumerate(vectors):
+        cache.put('bench', vector, f"reply {i}")
+
+    # Half the probes are near-duplicates of cached prompts, half are unrelated
+    picks = vectors[rng.integers(0, size, queries // 2)]
+    near = picks + rng.standard_normal(picks.shape).astype(np.float32) * 0.1
+    far = rng.standard_normal((queries - len(near), dim)).astype(np.float32)
+    probes = np.concatenate([near, far])
+
+    start = time.perf_counter()
+    for probe in probes:
+        cache.lookup('bench', probe)
+    elapsed = time.perf_counter() - start
+
+    return elapsed / queries * 1000, cache.stats()['hit_rate']
+
+
+async def bench_ollama(base_url, model, embed_model, runs):
+    """Time embedding and generation round trips against a live Ollama"""
+    from ollama_client import OllamaClient
+
+    client = OllamaClient(base_url, model, read_timeout=120)
+    await client.start()
+    try:
+        prompt = "roast me please"
+        embed_times = []
+        generate_times = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            await client.embed(prompt, embed_model)
+            embed_times.append((time.perf_counter() - start) * 1000)
+
+            start = time.perf_counter()
+            await client.generate(prompt)
+            generate_times.append((time.perf_counter() - start) * 1000)
+    finally:
+        await client.close()
+
+    return float(np.median(embed_times)), float(np.median(generate_times))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the semantic response cache")
+    parser.add_argument('--sizes', default='100,1000,2000,10000', help="Comma separated index sizes")
+    parser.add_argument('--dim', type=int, default=768, help="Embedding dimensions (nomic-embed-text: 768)")
+    parser.add_argument('--queries', type=int, default=2000, help="Lookups per index size")
+    parser.add_argument('--threshold', type=float, default=0.92, help="Similarity threshold")
+    parser.add_argument('--ollama', action='store_true', help="Also time embedding and generation on a live Ollama")
+    parser.add_argument('--base-url', default='http://localhost:11434')
+    parser.add_argument('--model', default='mistral:7b-instruct-q4_0')
+    parser.add_argument('--embed-model', default='nomic-embed-text')
+    parser.add_argument('--runs', type=int, default=5, help="Live Ollama round trips to time")
+    args = parser.parse_args()
+
+    print(f"📊 Semantic cache lookup ({args.dim} dims, {args.queries} queries)")
+    print(f"{'entries':>10} {'ms/lookup':>12} {'hit rate':>10}")
+    for size in (int(size) for size in args.sizes.split(',')):
+        per_lookup, hit_rate = bench_lookup(size, args.dim, args.queries, args.threshold)
+        print(f"{size:>10} {per_lookup:>12.4f} {hit_rate*100:>9.1f}%")
+
+    if args.ollama:
+        embed_ms, generate_ms = asyncio.run(bench_ollama(args.base_url, args.model, args.embed_model, args.runs))
+        print()
+        print(f"🤖 Live Ollama (median of {args.runs})")
+        print(f"Embedding:  {embed_ms:.1f} ms")
+        print(f"Generation: {generate_ms:.1f} ms")
+        print(f"A semantic hit saves ~{generate_ms - embed_ms:.1f} ms per reply")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Trigger Benchmark - Compiled trigger matching against the per-word substring loop
+"""
+import argparse
+import os
+import random
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from triggers import TriggerMatcher
+
+
+def loop_match(trigger_words, content):
+    """The trigger check should_auto_reply ran before triggers were compiled"""
+    message_content = content.lower()
+    return any(word.lower() in message_content for word in trigger_words)
+
+
+def random_word(rng):
+    return "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(3, 10)))
+
+
+def make_messages(rng, count, length, triggers, hit_rate):
+    """Build messages of about length characters, hit_rate of them holding a trigger"""
+    messages = []
+    for _ in range(count):
+        words = []
+        while sum(len(word) + 1 for word in words) < length:
+            words.append(random_word(rng).capitalize() if rng.random() < 0.1 else random_word(rng))
+        if rng.random() < hit_rate:
+            words[rng.randrange(len(words))] = rng.choice(triggers).upper()
+        messages.append(" ".join(words))
+    return messages
+
+
+def bench(check, messages, rounds):
+    """Get messages checked per second and the share that matched"""
+    matched = sum(bool(check(message)) for message in messages)
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for message in messages:
+            check(message)
+    elapsed = time.perf_counter() - start
+    return len(messages) * rounds / elapsed, matched / len(messages)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark auto-reply trigger matching")
+    parser.add_argument('--triggers', default='10,100,500', help="Comma separated trigger set sizes")
+    parser.add_argument('--lengths', default='40,400,2000', help="Comma separated message lengths in characters")
+    parser.add_argument('--messages', type=int, default=1000, help="Distinct messages per case")
+    parser.add_argument('--rounds', type=int, default=5, help="Passes over the messages per case")
+    parser.add_argument('--hit-rate', type=float, default=0.2, help="Fraction of messages holding a trigger")
+    parser.add_argument('--whole-words', action='store_true', help="Also time whole-word matching")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    print(f"🎯 Trigger matching ({args.messages} messages x {args.rounds} rounds, {args.hit_rate*100:.0f}% hold a trigger)")
+    header = f"{'triggers':>9} {'chars':>6} {'loop msg/s':>12} {'compiled msg/s':>15} {'speedup':>8}"
+    if args.whole_words:
+        header += f" {'whole-word msg/s':>17}"
+    print(header)
+
+    for count in (int(value) for value in args.triggers.split(',')):
+        triggers = sorted({random_word(rng) for _ in range(count)})
+        compile_start = time.perf_counter()
+        matcher = TriggerMatcher(triggers)
+        compile_ms = (time.perf_counter() - compile_start) * 1000
+        for length in (int(value) for value in args.lengths.split(',')):
+            messages = make_messages(rng, args.messages, length, triggers, args.hit_rate)
+            loop_rate, loop_matched = bench(lambda message: loop_match(triggers, message), messages, args.rounds)
+            compiled_rate, compiled_matched = bench(matcher.search, messages, args.rounds)
+            assert loop_matched == compiled_matched, "compiled triggers match different messages"
+            line = f"{len(triggers):>9} {length:>6} {loop_rate:>12,.0f} {compiled_rate:>15,.0f} {compiled_rate / loop_rate:>7.1f}x"
+            if args.whole_words:
+                whole_rate, _ = bench(TriggerMatcher(triggers, whole_words=True).search, messages, args.rounds)
+                line += f" {whole_rate:>17,.0f}"
+            print(line)
+        print(f"{'':>9} compiled {len(triggers)} triggers in {compile_ms:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
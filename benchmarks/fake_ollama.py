@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Fake Ollama - Stub Ollama server with configurable latency and token rate for offline benchmarks
+"""
+import argparse
+import asyncio
+import json
+import time
+from aiohttp import web
+
+WORDS = "you type like a potato and your jokes are older than the server you run on".split()
+
+
+class FakeOllama:
+    def __init__(self, latency=0.2, token_rate=50.0, tokens=40, load_time=0.0, parallel=0):
+        self.latency = latency  # Seconds of prompt evaluation before the first token
+        self.token_rate = token_rate  # Tokens generated per second, 0 for instant
+        self.tokens = tokens  # Tokens per reply
+        self.load_time = load_time  # Extra delay on the first request, like a cold model
+        self.slots = asyncio.Semaphore(parallel) if parallel > 0 else None  # Like OLLAMA_NUM_PARALLEL
+        self.loaded = False
+        self.embed_loaded = set()  # Embedding models loaded through /api/embeddings
+        self.load_lock = asyncio.Lock()  # Requests arriving during the load wait for it
+        self.active = 0
+        self.requests = 0
+
+    def tokens_for(self, count):
+        """Yield the fake reply one token at a time"""
+        for i in range(count):
+            yield WORDS[i % len(WORDS)] + " "
+
+    def content(self, chat, text):
+        """Wrap reply text the way /api/chat or /api/generate returns it"""
+        if chat:
+            return {'message': {'role': 'assistant', 'content': text}}
+        return {'response': text}
+
+    def timings(self, load, prompt_eval, eval_time, prompt_tokens):
+        """Build the duration fields Ollama reports, in nanoseconds"""
+        return {
+            'load_duration': int(load * 1e9),
+            'prompt_eval_count': prompt_tokens,
+            'prompt_eval_duration': int(prompt_eval * 1e9),
+            'eval_count': self.tokens,
+            'eval_duration': int(eval_time * 1e9),
+            'total_duration': int((load + prompt_eval + eval_time) * 1e9)
+        }
+
+    async def warm_up(self):
+        """Delay requests until the model has loaded, returns the seconds waited"""
+        if self.loaded:
+            return 0.0
+        start = time.perf_counter()
+        async with self.load_lock:
+            if not self.loaded:
+                await asyncio.sleep(self.load_time)
+                self.loaded = True
+        return time.perf_counter() - start
+
+    async def handle_generate(self, request):
+        """Serve /api/generate and /api/chat, streaming or not"""
+        body = await request.json()
+        chat = request.path.endswith('/chat')
+        if 'embed' in body.get('model', ''):
+            # Like Ollama, embedding-only models can't generate, not even to load
+            return web.json_response({'error': f"\"{body['model']}\" does not support generate"}, status=400)
+        if not body.get('prompt') and not body.get('messages'):
+            # Like Ollama, a request without a prompt only loads the model
+            load = await self.warm_up()
+            return web.json_response({'model': body.get('model'), 'done': True, 'done_reason': 'load',
+                                      'load_duration': int(load * 1e9)})
+        prompt = json.dumps(body.get('messages')) if chat else body.get('prompt', '')
+        prompt_tokens = len(prompt) // 4 + 1
+
+        self.requests += 1
+        if self.slots is not None:
+            await self.slots.acquire()
+        self.active += 1
+        try:
+            load = await self.warm_up()
+            await asyncio.sleep(self.latency)
+            delay = 1.0 / self.token_rate if self.token_rate > 0 else 0.0
+
+            if not body.get('stream', True):
+                start = time.perf_counter()
+                await asyncio.sleep(delay * self.tokens)
+                text = "".join(self.tokens_for(self.tokens)).strip()
+                data = {'model': body.get('model'), 'done': True}
+                data.update(self.content(chat, text))
+                data.update(self.timings(load, self.latency, time.perf_counter() - start, prompt_tokens))
+                return web.json_response(data)
+
+            response = web.StreamResponse(headers={'Content-Type': 'application/x-ndjson'})
+            await response.prepare(request)
+            start = time.perf_counter()
+            for token in self.tokens_for(self.tokens):
+                chunk = {'model': body.get('model'), 'done': False}
+                chunk.update(self.content(chat, token))
+                await response.write(json.dumps(chunk).encode('utf-8') + b'\n')
+                if delay:
+                    await asyncio.sleep(delay)
+            final = {'model': body.get('model'), 'done': True}
+            final.update(self.timings(load, self.latency, time.perf_counter() - start, prompt_tokens))
+            await response.write(json.dumps(final).encode('utf-8') + b'\n')
+            await response.write_eof()
+            return response
+        finally:
+            self.active -= 1
+            if self.slots is not None:
+                self.slots.release()
+
+    async def handle_tags(self, request):
+        """Serve /api/tags for health checks"""
+        return web.json_response({'models': [{'name': 'mistral:7b-instruct-q4_0'}, {'name': 'nomic-embed-text'}]})
+
+    async def handle_ps(self, request):
+        """Serve /api/ps, listing the model once it's loaded"""
+        models = [{'name': 'mistral:7b-instruct-q4_0', 'model': 'mistral:7b-instruct-q4_0'}] if self.loaded else []
+        models.extend({'name': name, 'model': name} for name in sorted(self.embed_loaded))
+        return web.json_response({'models': models})
+
+    async def handle_embeddings(self, request):
+        """Serve /api/embeddings with a cheap deterministic vector"""
+        body = await request.json()
+        self.embed_loaded.add(body.get('model', ''))
+        text = body.get('prompt', '')
+        vector = [0.0] * 64
+        for i, char in enumerate(text.lower()):
+            vector[(ord(char) + i) % 64] += 1.0
+        return web.json_response({'embedding': vector})
+
+    def app(self):
+        app = web.Application()
+        app.router.add_post('/api/generate', self.handle_generate)
+        app.router.add_post('/api/chat', self.handle_generate)
+        app.router.add_get('/api/tags', self.handle_tags)
+        app.router.add_get('/api/ps', self.handle_ps)
+        app.router.add_post('/api/embeddings', self.handle_embeddings)
+        return app
+
+    async def start(self, host='127.0.0.1', port=11435):
+        """Serve in the running event loop, returns the runner to clean up"""
+        runner = web.AppRunner(self.app(), access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, host, port).start()
+        return runner
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a stub Ollama server")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=11435)
+    parser.add_argument('--latency', type=float, default=0.2, help="Seconds before the first token")
+    parser.add_argument('--token-rate', type=float, default=50.0, help="Tokens per second, 0 for instant")
+    parser.add_argument('--tokens', type=int, default=40, help="Tokens per reply")
+    parser.add_argument('--load-time', type=float, default=0.0, help="Extra delay on the first request")
+    parser.add_argument('--parallel', type=int, default=0, help="Requests served at once, 0 for unlimited")
+    args = parser.parse_args()
+
+    fake = FakeOllama(args.latency, args.token_rate, args.tokens, args.load_time, args.parallel)
+    print(f"🤖 Fake Ollama on http://{args.host}:{args.port} "
+          f"({args.latency}s latency, {args.token_rate} tokens/s, {args.tokens} tokens)")
+    web.run_app(fake.app(), host=args.host, port=args.port, print=None, access_log=None)
+
+
+if __name__ == "__main__":
+    main()
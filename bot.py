@@ -1,14 +1,68 @@
 import discord
 from discord.ext import commands
-import requests
+import aiohttp
 import json
 import asyncio
-import sqlite3
+import copy
 import os
-from datetime import datetime, timedelta
+import random
+import time
+from datetime import datetime
 from config import *
+from ollama_client import OllamaClient, OllamaError, COLD_LOAD_SECONDS
+from cooldowns import CooldownTracker
+from scheduler import GenerationScheduler, QueueFull
+from context_store import ContextStore, estimate_tokens
+from response_cache import ResponseCache
+from semantic_cache import SemanticCache
+from shared_state import StateVersions, shard_for_guild
+from worker_pool import WorkerBroker
+from database import Database
+from singleflight import SingleFlight, request_key
+from personality import PersonalityStore, default_personality, neutral_personality
+from admission import Admission, compile_admissions
+from router import ModelRouter, ROUTES
+import metrics
+import tracing
 
-class OllamaDiscordBot(commands.Bot):
+# Policy used for guilds without a server_policies row
+DEFAULT_POLICY = {
+    'enabled': True,
+    'allowed_channels': frozenset(),
+    'blocked_channels': frozenset(),
+    'allowed_roles': frozenset(),
+    'blocked_roles': frozenset(),
+    'cooldown_seconds': 5,
+    'max_message_length': 2000,
+    'require_mention': False,
+    'admin_only': False,
+    'response_cache': False,
+    'model_route': 'auto'
+}
+
+# Compiled admission checks for guilds without a server_policies row
+DEFAULT_ADMISSION = Admission(DEFAULT_POLICY)
+
+def parse_policy_row(row):
+    """Convert a server_policies row into a policy dict with pre-parsed ID sets"""
+    return {
+        'enabled': bool(row[1]),
+        'allowed_channels': frozenset(row[2].split(',')) if row[2] else frozenset(),
+        'blocked_channels': frozenset(row[3].split(',')) if row[3] else frozenset(),
+        'allowed_roles': frozenset(row[4].split(',')) if row[4] else frozenset(),
+        'blocked_roles': frozenset(row[5].split(',')) if row[5] else frozenset(),
+        'cooldown_seconds': row[6],
+        'max_message_length': row[7],
+        'require_mention': bool(row[8]),
+        'admin_only': bool(row[9]),
+        'response_cache': bool(row[11]) if len(row) > 11 else False,
+        'model_route': row[12] if len(row) > 12 and row[12] else 'auto'
+    }
+
+# Sharded mode runs the gateway through AutoShardedBot, optionally limited to SHARD_IDS
+BotBase = commands.AutoShardedBot if SHARDED else commands.Bot
+
+class OllamaDiscordBot(BotBase):
     def __init__(self):
         intents = discord.Intents.default()
         intents.message_content = True
@@ -16,43 +70,277 @@ class OllamaDiscordBot(commands.Bot):
         intents.guilds = True
         intents.members = True
         
+        shard_options = {}
+        if SHARDED:
+            shard_options = {'shard_count': SHARD_COUNT, 'shard_ids': SHARD_IDS}
+        
         super().__init__(
             command_prefix=BOT_PREFIX,
             intents=intents,
-            help_command=None
+            help_command=None,
+            **shard_options
         )
         
         # Initialize database for server policies
         self.init_database()
         
+        # Change notifications from other bot processes and the policy manager
+        self.state_versions = StateVersions(self.db)
+        
+        # Cache every server policy in memory, kept current on write
+        self.load_policy_cache()
+        
+        # Track user cooldowns in memory, optionally flushed to user_cooldowns
+        self.cooldowns = CooldownTracker(self.db if COOLDOWN_PERSIST else None)
+        if COOLDOWN_PERSIST:
+            self.cooldowns.load(
+                lambda guild_id: self.get_server_policy(guild_id)['cooldown_seconds'],
+                guild_filter=self.owns_guild
+            )
+        
         # Load base policy from file
         self.load_base_policy()
         
-        # AI personality and safety settings
-        self.personality_settings = {
-            'system_prompt': self.base_policy,
-            'safety_level': 'moderate',  # strict, moderate, permissive
-            'max_response_length': 2000,
-            'temperature': 0.7,
-            'context_length': 10,  # Number of previous messages to remember
-            'context_enabled': True,  # Whether to use context at all
-            'auto_reply_enabled': True,  # Whether to auto-reply without mentions
-            'auto_reply_trigger_words': [],  # Words that trigger auto-reply
-            'auto_reply_probability': 1.0,  # Probability of auto-replying (0.0-1.0)
-            'auto_reply_cooldown': 10,  # Seconds between auto-replies in same channel
-            'personality_traits': {
-                'formality': 'casual',  # formal, casual, friendly
-                'humor': 'light',       # none, light, moderate, heavy
-                'helpfulness': 'high',  # low, medium, high
-                'creativity': 'medium'   # low, medium, high
-            }
-        }
+        # Global AI personality and safety settings, overridden per guild and channel
+        default_settings = default_personality(self.base_policy)
+        
+        # Every shard process serves the same global personality
+        if SHARDED:
+            shared_settings = self.state_versions.get_setting('personality')
+            if shared_settings:
+                default_settings = shared_settings
+        
+        # Personality profiles of recently active guilds, each prompt compiled once
+        self.personalities = PersonalityStore(
+            default_settings,
+            self.db,
+            state_versions=self.state_versions,
+            max_guilds=PERSONALITY_CACHE_SIZE
+        )
         
         # Store conversation context per channel
-        self.conversation_context = {}
+        self.conversation_context = ContextStore(
+            CONTEXT_TOKEN_BUDGET,
+            db=self.db if CONTEXT_PERSIST else None,
+            max_channels=CONTEXT_MAX_CHANNELS
+        )
         
         # Track auto-reply cooldowns per channel
         self.auto_reply_cooldowns = {}
+        
+        # Cache of replies to repeated prompts, used by guilds that opt in
+        self.response_cache = ResponseCache(RESPONSE_CACHE_SIZE, RESPONSE_CACHE_TTL)
+        self.semantic_cache = None
+        if SEMANTIC_CACHE_ENABLED:
+            self.semantic_cache = SemanticCache(SEMANTIC_CACHE_SIZE, SEMANTIC_CACHE_THRESHOLD, RESPONSE_CACHE_TTL)
+        
+        # Fire-and-forget work that must not be garbage collected mid-flight
+        self.background_tasks = set()
+        
+        # Messages waiting on a channel's not-yet-started generation
+        self.open_batches = {}
+        
+        # Fair, bounded queue in front of Ollama's parallel slots
+        self.scheduler = GenerationScheduler(
+            concurrency=OLLAMA_PARALLEL,
+            max_queue=GENERATION_QUEUE_SIZE
+        )
+        
+        # Shared HTTP client for all Ollama traffic (session opened in setup_hook)
+        self.ollama = OllamaClient(
+            OLLAMA_BASE_URLS,
+            OLLAMA_MODEL,
+            pool_size=OLLAMA_POOL_SIZE,
+            connect_timeout=OLLAMA_CONNECT_TIMEOUT,
+            read_timeout=OLLAMA_READ_TIMEOUT,
+            keepalive_timeout=OLLAMA_KEEPALIVE_TIMEOUT,
+            keep_alive=OLLAMA_KEEP_ALIVE or None,
+            balance=OLLAMA_BALANCE,
+            load_timeout=OLLAMA_LOAD_TIMEOUT,
+            embed_models=[OLLAMA_EMBED_MODEL] if SEMANTIC_CACHE_ENABLED else []
+        )
+        
+        # Sends short messages and overflow traffic to OLLAMA_FAST_MODEL when one is set
+        self.router = ModelRouter(
+            OLLAMA_MODEL,
+            OLLAMA_FAST_MODEL,
+            short_message=ROUTER_SHORT_MESSAGE,
+            max_context_tokens=ROUTER_MAX_CONTEXT_TOKENS,
+            queue_threshold=ROUTER_QUEUE_THRESHOLD,
+            latency_target=ROUTER_LATENCY_TARGET
+        )
+        
+        # Models kept loaded in Ollama while traffic is active
+        self.warm_models = list(self.router.models)
+        if SEMANTIC_CACHE_ENABLED:
+            self.warm_models.append(OLLAMA_EMBED_MODEL)
+        self.last_activity = None  # Monotonic time of the last generation request
+        self.warmup_task = None
+        
+        # Identical generations in flight at the same time share one Ollama call
+        self.inflight = SingleFlight()
+        
+        # Generation runs in worker.py processes when any are connected
+        self.workers = WorkerBroker(WORKER_ADDRESS, job_timeout=WORKER_JOB_TIMEOUT) if WORKER_ADDRESS else None
+        
+        # Gauges read at scrape time, served when METRICS_PORT is set
+        metrics.IN_FLIGHT.set_function(lambda: self.scheduler.in_flight)
+        metrics.QUEUE_DEPTH.set_function(lambda: self.scheduler.depth)
+        metrics.CONTEXT_TOKENS.set_function(self.conversation_context.total_tokens)
+        metrics.CONTEXT_CHANNELS.set_function(lambda: len(self.conversation_context.channels))
+        self.metrics_runner = None
+        
+        # Per-message span trees, appended to TRACE_FILE in batches
+        tracing.tracer.configure(TRACE_FILE, TRACE_SAMPLE_RATE)
+    
+    async def setup_hook(self):
+        """Open async resources before connecting to Discord"""
+        await self.ollama.start()
+        if self.workers is not None:
+            await self.workers.start()
+        if METRICS_PORT:
+            self.metrics_runner = await metrics.registry.start_server(METRICS_HOST, METRICS_PORT)
+        self.ollama_health_task = asyncio.create_task(self.ollama.run_health_checks(OLLAMA_HEALTH_INTERVAL))
+        self.cooldown_janitor_task = asyncio.create_task(self.cooldown_janitor())
+        self.context_flusher_task = asyncio.create_task(self.context_flusher())
+        self.state_watcher_task = asyncio.create_task(self.state_watcher())
+        if OLLAMA_WARMUP:
+            # Load in the background so the gateway connects meanwhile, early requests wait on it
+            self.warmup_task = asyncio.create_task(self.warm_up_models())
+        if OLLAMA_KEEP_WARM_INTERVAL > 0:
+            self.keep_warm_task = asyncio.create_task(self.keep_warm())
+        if TRACE_FILE:
+            self.trace_flusher_task = asyncio.create_task(self.trace_flusher())
+    
+    async def close(self):
+        """Close async resources on shutdown"""
+        await super().close()
+        if self.workers is not None:
+            await self.workers.close()
+        if self.metrics_runner is not None:
+            await self.metrics_runner.cleanup()
+        await self.ollama.close()
+        if COOLDOWN_PERSIST:
+            self.db.call(self.cooldowns.flush)
+        self.conversation_context.close()
+        self.db.close()
+        tracing.tracer.flush()
+    
+    def spawn(self, coro):
+        """Run a coroutine in the background, keeping a reference until it finishes"""
+        task = asyncio.create_task(coro)
+        self.background_tasks.add(task)
+        task.add_done_callback(self.background_tasks.discard)
+        return task
+    
+    def owns_guild(self, guild_id):
+        """Check if this process serves the guild's shard"""
+        if not SHARDED or SHARD_IDS is None:
+            return True
+        return shard_for_guild(guild_id, SHARD_COUNT) in SHARD_IDS
+    
+    async def warm_up_models(self):
+        """Load the models on every backend before users need them"""
+        for model in self.warm_models:
+            for backend, result in await self.ollama.warm_up(model):
+                if isinstance(result, Exception):
+                    print(f"⚠️ Could not load {model} on {backend.url}: {result!r}")
+                    continue
+                if result >= COLD_LOAD_SECONDS:
+                    metrics.MODEL_LOAD.observe(result, model=model)
+                print(f"🔥 {model} loaded on {backend.url} in {result:.1f}s")
+        self.update_model_metrics()
+    
+    async def keep_warm(self):
+        """Renew keep_alive while traffic is active, otherwise track which models Ollama unloaded"""
+        while True:
+            await asyncio.sleep(OLLAMA_KEEP_WARM_INTERVAL)
+            active = self.last_activity is not None and time.monotonic() - self.last_activity < OLLAMA_KEEP_WARM_IDLE
+            backends = [backend for backend in self.ollama.backends if backend.healthy]
+            if active:
+                # A ping returns at once for a loaded model and reloads one Ollama dropped
+                pings = [(backend, model, self.ollama.warm(backend, model))
+                         for backend in backends for model in self.warm_models]
+                results = await asyncio.gather(*(task for _, _, task in pings), return_exceptions=True)
+                for (backend, model, _), result in zip(pings, results):
+                    if isinstance(result, Exception):
+                        print(f"Error keeping {model} loaded on {backend.url}: {result!r}")
+                    elif result >= COLD_LOAD_SECONDS:
+                        metrics.MODEL_LOAD.observe(result, model=model)
+                        print(f"🔥 {model} reloaded on {backend.url} in {result:.1f}s")
+            else:
+                results = await asyncio.gather(
+                    *(self.ollama.refresh_model_state(backend, self.warm_models) for backend in backends),
+                    return_exceptions=True
+                )
+                for backend, result in zip(backends, results):
+                    if isinstance(result, Exception):
+                        print(f"Error checking loaded models on {backend.url}: {result!r}")
+            self.update_model_metrics()
+    
+    def note_activity(self):
+        """Record a generation request, reloading the model where Ollama unloaded it while idle"""
+        self.last_activity = time.monotonic()
+        for backend in self.ollama.backends:
+            for model in self.router.models:
+                if backend.healthy and backend.model_state.get(model) == 'cold':
+                    self.ollama.warm(backend, model)
+    
+    def update_model_metrics(self):
+        """Export each backend's model load state"""
+        for backend in self.ollama.backends:
+            for model in self.warm_models:
+                loaded = backend.model_state.get(model) == 'loaded'
+                metrics.MODEL_LOADED.set(1 if loaded else 0, backend=backend.url, model=model)
+    
+    async def state_watcher(self):
+        """Apply shared state changed by other processes"""
+        while True:
+            await asyncio.sleep(STATE_POLL_INTERVAL)
+            try:
+                changed = await self.db.run(self.state_versions.changed)
+                if 'policies' in changed:
+                    self.apply_policies(await self.db.run(self.read_policies))
+                if 'personality' in changed:
+                    shared_settings = await self.db.run(self.state_versions.get_setting, 'personality')
+                    if SHARDED and shared_settings:
+                        self.personalities.set_defaults(shared_settings)
+                if 'personality_profiles' in changed:
+                    self.personalities.invalidate()
+                if 'context' in changed:
+                    self.conversation_context.clear(persist=False)
+            except Exception as e:
+                print(f"Error syncing shared state: {e}")
+    
+    async def context_flusher(self):
+        """Write new conversation turns to the database in batches"""
+        while True:
+            await asyncio.sleep(CONTEXT_FLUSH_INTERVAL)
+            try:
+                await self.conversation_context.flush()
+            except Exception as e:
+                print(f"Error flushing context: {e}")
+    
+    async def trace_flusher(self):
+        """Write finished tracing spans to the trace file in batches"""
+        loop = asyncio.get_event_loop()
+        while True:
+            await asyncio.sleep(TRACE_FLUSH_INTERVAL)
+            try:
+                await loop.run_in_executor(None, tracing.tracer.write_pending, tracing.tracer.take_pending())
+            except Exception as e:
+                print(f"Error writing traces: {e}")
+    
+    async def cooldown_janitor(self):
+        """Evict expired cooldowns and flush pending ones in batches"""
+        while True:
+            await asyncio.sleep(COOLDOWN_FLUSH_INTERVAL)
+            self.cooldowns.evict_expired()
+            if COOLDOWN_PERSIST:
+                try:
+                    await self.db.run(self.cooldowns.write_pending, *self.cooldowns.take_pending())
+                except Exception as e:
+                    print(f"Error flushing cooldowns: {e}")
     
     def load_base_policy(self):
         """Load base policy from base_policy.txt file"""
@@ -70,253 +358,193 @@ class OllamaDiscordBot(commands.Bot):
     def init_database(self):
         """Initialize SQLite database for server policies"""
         self.db_path = "bot_policies.db"
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Create tables for server policies
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS server_policies (
-                guild_id INTEGER PRIMARY KEY,
-                enabled BOOLEAN DEFAULT 1,
-                allowed_channels TEXT,
-                blocked_channels TEXT,
-                allowed_roles TEXT,
-                blocked_roles TEXT,
-                cooldown_seconds INTEGER DEFAULT 5,
-                max_message_length INTEGER DEFAULT 2000,
-                require_mention BOOLEAN DEFAULT 0,
-                admin_only BOOLEAN DEFAULT 0,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS user_cooldowns (
-                guild_id INTEGER,
-                user_id INTEGER,
-                last_used TIMESTAMP,
-                PRIMARY KEY (guild_id, user_id)
-            )
-        ''')
-        
-        conn.commit()
-        conn.close()
+        self.db = Database(self.db_path)
+        
+        with self.db.transaction():
+            # Create tables for server policies
+            self.db.execute('''
+                CREATE TABLE IF NOT EXISTS server_policies (
+                    guild_id INTEGER PRIMARY KEY,
+                    enabled BOOLEAN DEFAULT 1,
+                    allowed_channels TEXT,
+                    blocked_channels TEXT,
+                    allowed_roles TEXT,
+                    blocked_roles TEXT,
+                    cooldown_seconds INTEGER DEFAULT 5,
+                    max_message_length INTEGER DEFAULT 2000,
+                    require_mention BOOLEAN DEFAULT 0,
+                    admin_only BOOLEAN DEFAULT 0,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            
+            # Add columns introduced after the table was first created
+            columns = [row[1] for row in self.db.query('PRAGMA table_info(server_policies)')]
+            if 'response_cache' not in columns:
+                self.db.execute('ALTER TABLE server_policies ADD COLUMN response_cache BOOLEAN DEFAULT 0')
+            if 'model_route' not in columns:
+                self.db.execute("ALTER TABLE server_policies ADD COLUMN model_route TEXT DEFAULT 'auto'")
+            
+            self.db.execute('''
+                CREATE TABLE IF NOT EXISTS user_cooldowns (
+                    guild_id INTEGER,
+                    user_id INTEGER,
+                    last_used TIMESTAMP,
+                    PRIMARY KEY (guild_id, user_id)
+                )
+            ''')
+            
+            self.db.execute('''
+                CREATE TABLE IF NOT EXISTS conversation_context (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    channel_id INTEGER,
+                    user_message TEXT,
+                    bot_response TEXT,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            
+            self.db.execute('''
+                CREATE INDEX IF NOT EXISTS idx_conversation_context_channel
+                ON conversation_context (channel_id, id)
+            ''')
+    
+    def read_policies(self):
+        """Read all server policies from the database"""
+        results = self.db.query('SELECT * FROM server_policies')
+        return {row[0]: parse_policy_row(row) for row in results}
+    
+    def load_policy_cache(self):
+        """Load all server policies into the in-memory cache"""
+        self.apply_policies(self.read_policies())
+    
+    def apply_policies(self, policies):
+        """Replace the policy cache and recompile every guild's admission checks"""
+        self.policy_cache = policies
+        self.admissions = compile_admissions(policies)
     
     def get_server_policy(self, guild_id):
-        """Get server policy from database"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute('SELECT * FROM server_policies WHERE guild_id = ?', (guild_id,))
-        result = cursor.fetchone()
-        conn.close()
-        
-        if result:
-            return {
-                'enabled': bool(result[1]),
-                'allowed_channels': result[2].split(',') if result[2] else [],
-                'blocked_channels': result[3].split(',') if result[3] else [],
-                'allowed_roles': result[4].split(',') if result[4] else [],
-                'blocked_roles': result[5].split(',') if result[5] else [],
-                'cooldown_seconds': result[6],
-                'max_message_length': result[7],
-                'require_mention': bool(result[8]),
-                'admin_only': bool(result[9])
-            }
-        else:
-            # Default policy
-            return {
-                'enabled': True,
-                'allowed_channels': [],
-                'blocked_channels': [],
-                'allowed_roles': [],
-                'blocked_roles': [],
-                'cooldown_seconds': 5,
-                'max_message_length': 2000,
-                'require_mention': False,
-                'admin_only': False
-            }
+        """Get server policy from the cache"""
+        return self.policy_cache.get(guild_id, DEFAULT_POLICY)
     
-    def update_server_policy(self, guild_id, **kwargs):
-        """Update server policy in database"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Get existing policy
-        cursor.execute('SELECT * FROM server_policies WHERE guild_id = ?', (guild_id,))
-        existing = cursor.fetchone()
-        
-        if existing:
-            # Update existing policy
-            cursor.execute('''
-                UPDATE server_policies SET 
-                enabled = ?, allowed_channels = ?, blocked_channels = ?, 
-                allowed_roles = ?, blocked_roles = ?, cooldown_seconds = ?, 
-                max_message_length = ?, require_mention = ?, admin_only = ?
-                WHERE guild_id = ?
-            ''', (
-                kwargs.get('enabled', existing[1]),
-                ','.join(kwargs.get('allowed_channels', [])),
-                ','.join(kwargs.get('blocked_channels', [])),
-                ','.join(kwargs.get('allowed_roles', [])),
-                ','.join(kwargs.get('blocked_roles', [])),
-                kwargs.get('cooldown_seconds', existing[6]),
-                kwargs.get('max_message_length', existing[7]),
-                kwargs.get('require_mention', existing[8]),
-                kwargs.get('admin_only', existing[9]),
-                guild_id
-            ))
-        else:
-            # Insert new policy
-            cursor.execute('''
-                INSERT INTO server_policies 
-                (guild_id, enabled, allowed_channels, blocked_channels, 
-                 allowed_roles, blocked_roles, cooldown_seconds, 
-                 max_message_length, require_mention, admin_only)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                guild_id,
-                kwargs.get('enabled', True),
-                ','.join(kwargs.get('allowed_channels', [])),
-                ','.join(kwargs.get('blocked_channels', [])),
-                ','.join(kwargs.get('allowed_roles', [])),
-                ','.join(kwargs.get('blocked_roles', [])),
-                kwargs.get('cooldown_seconds', 5),
-                kwargs.get('max_message_length', 2000),
-                kwargs.get('require_mention', False),
-                kwargs.get('admin_only', False)
-            ))
-        
-        conn.commit()
-        conn.close()
+    async def update_server_policy(self, guild_id, **kwargs):
+        """Update server policy in database and refresh the cache"""
+        # Write-through: cache exactly what was stored
+        row = await self.db.run(self.write_server_policy, guild_id, kwargs)
+        policy = self.policy_cache[guild_id] = parse_policy_row(row)
+        self.admissions[guild_id] = Admission(policy)
     
-    def check_cooldown(self, guild_id, user_id):
-        """Check if user is on cooldown"""
-        policy = self.get_server_policy(guild_id)
-        if policy['cooldown_seconds'] <= 0:
-            return True
-        
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT last_used FROM user_cooldowns 
-            WHERE guild_id = ? AND user_id = ?
-        ''', (guild_id, user_id))
-        result = cursor.fetchone()
-        conn.close()
-        
-        if not result:
-            return True
+    def write_server_policy(self, guild_id, kwargs):
+        """Upsert a server_policies row and return it (blocking, run on the database writer thread)"""
+        with self.db.transaction(immediate=True):
+            # Get existing policy
+            existing = self.db.query_one('SELECT * FROM server_policies WHERE guild_id = ?', (guild_id,))
+            
+            if existing:
+                # Update existing policy, keeping list fields that weren't passed
+                self.db.execute('''
+                    UPDATE server_policies SET 
+                    enabled = ?, allowed_channels = ?, blocked_channels = ?, 
+                    allowed_roles = ?, blocked_roles = ?, cooldown_seconds = ?, 
+                    max_message_length = ?, require_mention = ?, admin_only = ?,
+                    response_cache = ?, model_route = ?
+                    WHERE guild_id = ?
+                ''', (
+                    kwargs.get('enabled', existing[1]),
+                    ','.join(kwargs['allowed_channels']) if 'allowed_channels' in kwargs else existing[2],
+                    ','.join(kwargs['blocked_channels']) if 'blocked_channels' in kwargs else existing[3],
+                    ','.join(kwargs['allowed_roles']) if 'allowed_roles' in kwargs else existing[4],
+                    ','.join(kwargs['blocked_roles']) if 'blocked_roles' in kwargs else existing[5],
+                    kwargs.get('cooldown_seconds', existing[6]),
+                    kwargs.get('max_message_length', existing[7]),
+                    kwargs.get('require_mention', existing[8]),
+                    kwargs.get('admin_only', existing[9]),
+                    kwargs.get('response_cache', existing[11]),
+                    kwargs.get('model_route', existing[12]),
+                    guild_id
+                ))
+            else:
+                # Insert new policy
+                self.db.execute('''
+                    INSERT INTO server_policies 
+                    (guild_id, enabled, allowed_channels, blocked_channels, 
+                     allowed_roles, blocked_roles, cooldown_seconds, 
+                     max_message_length, require_mention, admin_only, response_cache, model_route)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', (
+                    guild_id,
+                    kwargs.get('enabled', True),
+                    ','.join(kwargs.get('allowed_channels', [])),
+                    ','.join(kwargs.get('blocked_channels', [])),
+                    ','.join(kwargs.get('allowed_roles', [])),
+                    ','.join(kwargs.get('blocked_roles', [])),
+                    kwargs.get('cooldown_seconds', 5),
+                    kwargs.get('max_message_length', 2000),
+                    kwargs.get('require_mention', False),
+                    kwargs.get('admin_only', False),
+                    kwargs.get('response_cache', False),
+                    kwargs.get('model_route', 'auto')
+                ))
+            
+            row = self.db.query_one('SELECT * FROM server_policies WHERE guild_id = ?', (guild_id,))
         
-        last_used = datetime.fromisoformat(result[0])
-        cooldown_end = last_used + timedelta(seconds=policy['cooldown_seconds'])
-        return datetime.now() >= cooldown_end
+        self.state_versions.bump('policies')
+        return row
     
     def set_cooldown(self, guild_id, user_id):
         """Set user cooldown"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute('''
-            INSERT OR REPLACE INTO user_cooldowns (guild_id, user_id, last_used)
-            VALUES (?, ?, ?)
-        ''', (guild_id, user_id, datetime.now().isoformat()))
-        conn.commit()
-        conn.close()
+        policy = self.get_server_policy(guild_id)
+        self.cooldowns.touch(guild_id, user_id, policy['cooldown_seconds'])
     
-    def get_personality_prompt(self):
-        """Generate personality-based system prompt"""
-        traits = self.personality_settings['personality_traits']
-        base_prompt = self.personality_settings['system_prompt']
-        
-        # Add personality traits to prompt
-        personality_additions = []
-        
-        if traits['formality'] == 'formal':
-            personality_additions.append("Respond in a formal, professional tone.")
-        elif traits['formality'] == 'casual':
-            personality_additions.append("Respond in a casual, conversational tone.")
-        elif traits['formality'] == 'friendly':
-            personality_additions.append("Respond in a warm, friendly tone.")
-        
-        if traits['humor'] == 'light':
-            personality_additions.append("Occasionally use light humor when appropriate.")
-        elif traits['humor'] == 'moderate':
-            personality_additions.append("Use humor moderately to make responses engaging.")
-        elif traits['humor'] == 'heavy':
-            personality_additions.append("Use humor frequently to make responses entertaining.")
-        
-        if traits['helpfulness'] == 'high':
-            personality_additions.append("Be extremely helpful and thorough in your responses.")
-        elif traits['helpfulness'] == 'medium':
-            personality_additions.append("Be helpful and informative in your responses.")
-        
-        if traits['creativity'] == 'high':
-            personality_additions.append("Be creative and think outside the box.")
-        elif traits['creativity'] == 'medium':
-            personality_additions.append("Be moderately creative in your responses.")
-        
-        # Add safety guidelines
-        safety_guidelines = self.get_safety_guidelines()
-        
-        full_prompt = f"{base_prompt}\n\n"
-        if personality_additions:
-            full_prompt += "Personality: " + " ".join(personality_additions) + "\n\n"
-        if safety_guidelines:
-            full_prompt += f"Safety Guidelines: {safety_guidelines}\n\n"
-        
-        return full_prompt
+    def get_personality(self, message):
+        """Get the personality profile for a message's channel"""
+        guild_id = message.guild.id if message.guild else None
+        return self.personalities.get(guild_id, message.channel.id)
     
-    def get_safety_guidelines(self):
-        """Get safety guidelines based on safety level"""
-        safety_level = self.personality_settings['safety_level']
-        
-        if safety_level == 'strict':
-            return ("Never provide harmful, illegal, or inappropriate content. "
-                   "Always prioritize safety and ethical considerations. "
-                   "Refuse requests that could cause harm.")
-        elif safety_level == 'moderate':
-            return ("Avoid harmful or inappropriate content. "
-                   "Be cautious with sensitive topics and provide balanced perspectives.")
-        elif safety_level == 'permissive':
-            return ("Be helpful while being mindful of content appropriateness.")
+    async def update_personality(self, guild_id=None, channel_id=None, **kwargs):
+        """Update a guild or channel profile, or the global personality when guild_id is None"""
+        if guild_id is None:
+            self.personalities.update_defaults(kwargs)
+            self.publish_personality()
         else:
-            return ""
+            await self.personalities.update(guild_id, channel_id, kwargs)
     
-    def update_personality(self, **kwargs):
-        """Update personality settings"""
-        if 'personality_traits' in kwargs:
-            self.personality_settings['personality_traits'].update(kwargs['personality_traits'])
+    async def set_personality(self, guild_id, channel_id, settings):
+        """Replace a guild or channel profile, or the global personality when guild_id is None"""
+        if guild_id is None:
+            self.personalities.set_defaults(settings)
+            self.publish_personality()
         else:
-            self.personality_settings.update(kwargs)
+            await self.personalities.save(guild_id, channel_id, settings)
     
-    def add_to_context(self, channel_id, user_message, bot_response):
+    def publish_personality(self):
+        """Share global personality changes with the other shard processes"""
+        if SHARDED:
+            settings = copy.deepcopy(self.personalities.defaults)
+            self.db.submit(self.state_versions.publish_setting, 'personality', settings)
+    
+    def add_to_context(self, channel_id, user_message, bot_response, settings):
         """Add conversation to context"""
-        if not self.personality_settings['context_enabled']:
+        if not settings['context_enabled']:
             return
         
-        if channel_id not in self.conversation_context:
-            self.conversation_context[channel_id] = []
-        
-        # Add the conversation
-        self.conversation_context[channel_id].append({
-            'user': user_message,
-            'bot': bot_response
-        })
-        
-        # Keep only the last N conversations
-        max_context = self.personality_settings['context_length']
-        if len(self.conversation_context[channel_id]) > max_context:
-            self.conversation_context[channel_id] = self.conversation_context[channel_id][-max_context:]
+        # Keep the last N conversations within the token budget. In chat mode
+        # trim in blocks, so the prefix Ollama has cached survives most turns.
+        self.conversation_context.add(
+            channel_id,
+            user_message,
+            bot_response,
+            settings['context_length'],
+            block_trim=OLLAMA_USE_CHAT
+        )
     
-    def get_context_prompt(self, channel_id):
+    def get_context_prompt(self, channel_id, settings):
         """Get conversation context for the prompt"""
-        if not self.personality_settings['context_enabled']:
-            return ""
-        
-        if channel_id not in self.conversation_context:
+        if not settings['context_enabled']:
             return ""
         
         context_parts = []
-        for conv in self.conversation_context[channel_id]:
+        for conv in self.conversation_context.get(channel_id):
             context_parts.append(f"Human: {conv['user']}")
             context_parts.append(f"Assistant: {conv['bot']}")
         
@@ -324,41 +552,58 @@ class OllamaDiscordBot(commands.Bot):
             return "\n".join(context_parts) + "\n\n"
         return ""
     
+    def get_context_messages(self, channel_id, settings):
+        """Get conversation context as structured chat messages"""
+        if not settings['context_enabled']:
+            return []
+        
+        messages = []
+        for conv in self.conversation_context.get(channel_id):
+            messages.append({'role': 'user', 'content': conv['user']})
+            messages.append({'role': 'assistant', 'content': conv['bot']})
+        return messages
+    
     def clear_context(self, channel_id=None):
         """Clear conversation context"""
-        if channel_id:
-            if channel_id in self.conversation_context:
-                del self.conversation_context[channel_id]
-        else:
-            self.conversation_context.clear()
+        self.conversation_context.clear(channel_id)
+        if channel_id is None:
+            self.db.submit(self.state_versions.bump, 'context')
+    
+    def clear_guild_context(self, guild):
+        """Clear the conversation context of every channel and thread in a guild"""
+        # Only the shard serving the guild holds its channels, so there's nothing to announce
+        for channel in [*guild.channels, *guild.threads]:
+            self.conversation_context.clear(channel.id)
     
     def should_auto_reply(self, message):
         """Determine if bot should auto-reply to a message"""
-        if not self.personality_settings['auto_reply_enabled']:
+        profile = self.get_personality(message)
+        settings = profile.settings
+        if not settings['auto_reply_enabled']:
             return False
         
         # Check if we're on cooldown for this channel
         channel_id = message.channel.id
         current_time = datetime.now()
         
-        if channel_id in self.auto_reply_cooldowns:
+        # A generation is already pending here, so folding this message in is free
+        coalescing = COALESCE_MESSAGES and channel_id in self.open_batches
+        
+        if channel_id in self.auto_reply_cooldowns and not coalescing:
             last_reply = self.auto_reply_cooldowns[channel_id]
-            cooldown_seconds = self.personality_settings['auto_reply_cooldown']
+            cooldown_seconds = settings['auto_reply_cooldown']
             if (current_time - last_reply).total_seconds() < cooldown_seconds:
                 return False
         
-        # Check for trigger words
-        message_content = message.content.lower()
-        trigger_words = self.personality_settings['auto_reply_trigger_words']
+        # If trigger words are set, only reply if message contains them
+        if profile.triggers and not profile.triggers.search(message.content):
+            return False
         
-        if trigger_words:
-            # If trigger words are set, only reply if message contains them
-            if not any(word.lower() in message_content for word in trigger_words):
-                return False
+        if coalescing:
+            return True
         
         # Check probability
-        import random
-        probability = self.personality_settings['auto_reply_probability']
+        probability = settings['auto_reply_probability']
         if random.random() > probability:
             return False
         
@@ -371,7 +616,7 @@ class OllamaDiscordBot(commands.Bot):
     async def on_ready(self):
         print(f'{self.user} has connected to Discord!')
         print(f'Bot is in {len(self.guilds)} guilds')
-        print(f'Ollama URL: {OLLAMA_BASE_URL}')
+        print(f'Ollama URLs: {", ".join(OLLAMA_BASE_URLS)}')
         print(f'Ollama Model: {OLLAMA_MODEL}')
     
     async def on_message(self, message):
@@ -384,144 +629,409 @@ class OllamaDiscordBot(commands.Bot):
             await self.process_commands(message)
             return
         
-        # Check server policies for guild messages
-        if message.guild:
-            policy = self.get_server_policy(message.guild.id)
-            
-            # Check if bot is enabled in this server
-            if not policy['enabled']:
-                return
+        guild_id = message.guild.id if message.guild else None
+        with tracing.span('on_message', guild_id=guild_id, channel_id=message.channel.id) as root:
+            with tracing.span('filter'):
+                should_reply = await self.should_reply(message)
+            if root is not None:
+                root.set(replied=should_reply)
             
-            # Check if admin only and user is not admin
-            if policy['admin_only'] and not message.author.guild_permissions.administrator:
-                return
-            
-            # Check channel restrictions
-            channel_id = str(message.channel.id)
-            if policy['allowed_channels'] and channel_id not in policy['allowed_channels']:
-                return
-            if channel_id in policy['blocked_channels']:
-                return
-            
-            # Check role restrictions
-            user_roles = [str(role.id) for role in message.author.roles]
-            if policy['allowed_roles'] and not any(role in policy['allowed_roles'] for role in user_roles):
-                return
-            if any(role in policy['blocked_roles'] for role in user_roles):
-                return
+            if should_reply:
+                await self.handle_chat(message)
+    
+    async def should_reply(self, message):
+        """Apply server policies and reply triggers to a message"""
+        mentioned = self.user.mentioned_in(message)
+        
+        # Check server policies for guild messages, compiled once per policy change
+        if message.guild:
+            guild_id = message.guild.id
+            with metrics.POLICY_LOOKUP.time(), tracing.span('policy_lookup'):
+                admission = self.admissions.get(guild_id, DEFAULT_ADMISSION)
+                rejection = admission.check(message, mentioned)
+            if rejection is not None:
+                metrics.REJECTIONS.inc(reason=rejection)
+                return False
             
             # Check cooldown
-            if not self.check_cooldown(message.guild.id, message.author.id):
-                return
+            with metrics.COOLDOWN_CHECK.time(), tracing.span('check_cooldown'):
+                ready = self.cooldowns.is_ready(guild_id, message.author.id, admission.cooldown_seconds)
+            if not ready:
+                metrics.COOLDOWN_HITS.inc()
+                metrics.REJECTIONS.inc(reason='cooldown')
+                return False
             
-            # Check if mention is required
-            if policy['require_mention'] and not self.user.mentioned_in(message):
-                return
+            # Fetch this guild's personality profiles on first use, only once the cheap rejections passed
+            with tracing.span('load_personality'):
+                await self.personalities.ensure_loaded(guild_id)
         
         # Check if the bot is mentioned, if it's a DM, or if auto-reply is enabled
-        should_reply = (
-            self.user.mentioned_in(message) or 
+        return (
+            mentioned or
             isinstance(message.channel, discord.DMChannel) or
             self.should_auto_reply(message)
         )
-        
-        if should_reply:
-            await self.handle_chat(message)
     
     async def handle_chat(self, message):
         """Handle chat messages and get responses from Ollama"""
+        channel_id = message.channel.id
+        with tracing.span('get_personality'):
+            profile = self.get_personality(message)
+        settings = profile.settings
+        batch = None
         try:
             # Set cooldown for guild messages
             if message.guild:
                 self.set_cooldown(message.guild.id, message.author.id)
             
-            # Show typing indicator
-            async with message.channel.typing():
-                # Get the user's message content
-                user_message = message.content
+            # Fold into the channel's pending generation if one hasn't started yet
+            if COALESCE_MESSAGES:
+                pending_batch = self.open_batches.get(channel_id)
+                if pending_batch is not None:
+                    pending_batch.append(message)
+                    return
+                batch = [message]
+                self.open_batches[channel_id] = batch
+                if COALESCE_WINDOW > 0:
+                    await asyncio.sleep(COALESCE_WINDOW)
+            else:
+                batch = [message]
+            
+            # Get server policy for message length
+            max_length = MAX_MESSAGE_LENGTH
+            if message.guild:
+                policy = self.get_server_policy(message.guild.id)
+                max_length = policy['max_message_length']
+            
+            async def generate():
+                waited = time.perf_counter() - queued_at
+                with tracing.span('generate', queue_wait_ms=waited * 1000, batch_size=len(batch)):
+                    # Close the batch once generation starts; later messages open a new one
+                    if self.open_batches.get(channel_id) is batch:
+                        del self.open_batches[channel_id]
+                    
+                    user_message = self.get_batch_message(batch)
+                    
+                    # Load this channel's history from the database on first use
+                    if settings['context_enabled']:
+                        await self.conversation_context.ensure_loaded(channel_id, settings['context_length'])
+                    cache_scope = self.get_cache_scope(message.guild, channel_id, profile)
+                    
+                    # Prepare the prompt for Ollama with personality and context
+                    with metrics.PROMPT_BUILD.time():
+                        system_prompt = profile.prompt
+                        if OLLAMA_USE_CHAT:
+                            # Structured messages keep a stable prefix for Ollama's prompt cache
+                            prompt = [{'role': 'system', 'content': system_prompt}]
+                            with tracing.span('get_context_messages'):
+                                prompt.extend(self.get_context_messages(channel_id, settings))
+                            context_tokens = sum(estimate_tokens(turn['content']) for turn in prompt[1:])
+                            prompt.append({'role': 'user', 'content': user_message})
+                        else:
+                            with tracing.span('get_context_prompt'):
+                                context_prompt = self.get_context_prompt(channel_id, settings)
+                            context_tokens = estimate_tokens(context_prompt)
+                            prompt = "".join((system_prompt, "\n\n", context_prompt, "Human: ", user_message, "\n\nAssistant:"))
+                    
+                    # Route once the prompt is built, so the queue depth is the one this generation leaves behind
+                    model = self.choose_model(message.guild, user_message, context_tokens + estimate_tokens(user_message))
+                    
+                    if STREAM_RESPONSES:
+                        # Stream tokens into a progressively edited reply to the newest message
+                        with metrics.GENERATION.time(mode='stream', model=model), tracing.span('ollama_stream', model=model):
+                            response, complete = await self.stream_reply(batch[-1], prompt, max_length, route_key=channel_id, model=model)
+                    else:
+                        # Call Ollama API
+                        with metrics.GENERATION.time(mode='generate', model=model):
+                            response = await self.get_ollama_response(prompt, route_key=channel_id, model=model)
+                        complete = True
+                    
+                    if response and complete and cache_scope is not None:
+                        # Storing may need an embedding call, keep it off the reply path
+                        self.spawn(self.store_cached_response(cache_scope, user_message, response, embeddings))
+                    return user_message, response, STREAM_RESPONSES, complete
+            
+            # Answer repeated prompts from the response cache without queueing
+            response = None
+            embeddings = {}  # Reused between the cache lookup and the store after generating
+            if len(batch) == 1 and message.guild and self.get_server_policy(message.guild.id)['response_cache']:
+                if settings['context_enabled']:
+                    await self.conversation_context.ensure_loaded(channel_id, settings['context_length'])
+                user_message = self.get_batch_message(batch)
+                cache_scope = self.get_cache_scope(message.guild, channel_id, profile)
+                with tracing.span('cache_lookup') as span:
+                    response = await self.lookup_cached_response(cache_scope, user_message, embeddings)
+                    if span is not None:
+                        span.set(hit=response is not None)
                 
-                # Remove bot mention if present
-                if self.user.mentioned_in(message):
-                    user_message = user_message.replace(f'<@{self.user.id}>', '').strip()
+                # Messages folded in during the lookup need a generation that sees them all
+                if len(batch) > 1:
+                    response = None
+            
+            if response is not None:
+                if self.open_batches.get(channel_id) is batch:
+                    del self.open_batches[channel_id]
+                sent = False
+                complete = True
+                source = 'cache'
+            else:
+                # Queue the generation behind other guilds' work
+                guild_id = message.guild.id if message.guild else None
+                self.note_activity()
+                queued_at = time.perf_counter()
+                try:
+                    pending = self.scheduler.submit(guild_id, channel_id, generate)
+                except QueueFull:
+                    metrics.REJECTIONS.inc(reason='queue_full')
+                    await self.send_reply(message, "I'm a bit busy right now, try again in a moment.")
+                    return
                 
-                # Prepare the prompt for Ollama with personality and context
-                system_prompt = self.get_personality_prompt()
-                context_prompt = self.get_context_prompt(message.channel.id)
-                prompt = f"{system_prompt}\n\n{context_prompt}Human: {user_message}\n\nAssistant:"
+                # Show typing indicator
+                async with message.channel.typing():
+                    user_message, response, sent, complete = await pending
+                source = 'generated'
+            
+            reply_to = batch[-1]
+            if response and not sent:
+                await self.send_chunks(reply_to, response, max_length)
+            
+            if response:
+                metrics.REPLIES.inc(source=source)
                 
-                # Call Ollama API
-                response = await self.get_ollama_response(prompt)
+                # Store conversation in context, a reply cut off mid-stream would teach the model broken turns
+                if complete:
+                    self.add_to_context(channel_id, user_message, response, settings)
                 
-                if response:
-                    # Get server policy for message length
-                    max_length = MAX_MESSAGE_LENGTH
-                    if message.guild:
-                        policy = self.get_server_policy(message.guild.id)
-                        max_length = policy['max_message_length']
-                    
-                    # Split response if it's too long for Discord
-                    if len(response) > max_length:
-                        chunks = [response[i:i+max_length] for i in range(0, len(response), max_length)]
-                        for chunk in chunks:
-                            try:
-                                await message.reply(chunk)
-                            except discord.errors.HTTPException:
-                                # Fallback to regular send if reply fails
-                                await message.channel.send(chunk)
-                    else:
-                        try:
-                            await message.reply(response)
-                        except discord.errors.HTTPException:
-                            # Fallback to regular send if reply fails
-                            await message.channel.send(response)
-                    
-                    # Store conversation in context
-                    self.add_to_context(message.channel.id, user_message, response)
-                    
-                    # Set auto-reply cooldown if this was an auto-reply
-                    if not self.user.mentioned_in(message) and not isinstance(message.channel, discord.DMChannel):
-                        self.set_auto_reply_cooldown(message.channel.id)
-                else:
-                    try:
-                        await message.reply("Sorry, I couldn't generate a response. Please try again.")
-                    except discord.errors.HTTPException:
-                        await message.channel.send("Sorry, I couldn't generate a response. Please try again.")
+                # Set auto-reply cooldown if this was an auto-reply
+                if not self.user.mentioned_in(reply_to) and not isinstance(message.channel, discord.DMChannel):
+                    self.set_auto_reply_cooldown(channel_id)
+            else:
+                metrics.ERRORS.inc(kind='no_response')
+                await self.send_reply(reply_to, "Sorry, I couldn't generate a response. Please try again.")
                     
         except Exception as e:
+            metrics.ERRORS.inc(kind='handler')
             print(f"Error handling chat: {e}")
-            try:
-                await message.reply("Sorry, there was an error processing your message.")
-            except discord.errors.HTTPException:
-                await message.channel.send("Sorry, there was an error processing your message.")
+            await self.send_reply(message, "Sorry, there was an error processing your message.")
+        finally:
+            if batch is not None and self.open_batches.get(channel_id) is batch:
+                del self.open_batches[channel_id]
+    
+    def choose_model(self, guild, user_message, context_tokens):
+        """Pick the model for a generation from its size, the queue and the server's model policy"""
+        route = self.get_server_policy(guild.id)['model_route'] if guild else 'auto'
+        model, reason = self.router.choose(route, len(user_message), context_tokens, self.scheduler.depth)
+        metrics.ROUTES.inc(model=model, reason=reason)
+        tracing.annotate(model=model, route=reason, context_tokens=context_tokens)
+        return model
+    
+    def get_cache_scope(self, guild, channel_id, profile):
+        """Get the response cache scope for a channel, or None if the guild hasn't opted in"""
+        if guild is None:
+            return None
+        policy = self.get_server_policy(guild.id)
+        if not policy['response_cache']:
+            return None
+        
+        context = ""
+        turns = RESPONSE_CACHE_CONTEXT_TURNS
+        if turns > 0 and profile.settings['context_enabled']:
+            history = list(self.conversation_context.get(channel_id))[-turns:]
+            context = "\n".join(f"{conv['user']}\n{conv['bot']}" for conv in history)
+        # Replies may come from the fast model, so servers routed differently don't share them
+        return f"{self.ollama.model}\0{policy['model_route']}\0{profile.version}\0{context}"
     
-    async def get_ollama_response(self, prompt):
-        """Get response from Ollama API"""
+    async def get_embedding(self, text):
+        """Embed text for the semantic cache, None if Ollama can't"""
         try:
-            url = f"{OLLAMA_BASE_URL}/api/generate"
-            payload = {
-                "model": OLLAMA_MODEL,
-                "prompt": prompt,
-                "stream": False
-            }
+            return await self.ollama.embed(text, OLLAMA_EMBED_MODEL)
+        except Exception as e:
+            print(f"Embedding error: {e!r}")
+            return None
+    
+    async def lookup_cached_response(self, scope, user_message, embeddings):
+        """Find a cached reply, trying the exact tier then the semantic tier"""
+        response = self.response_cache.get(ResponseCache.make_key(scope, user_message))
+        if response is not None or self.semantic_cache is None:
+            return response
+        
+        embedding = embeddings[user_message] = await self.get_embedding(user_message)
+        if embedding:
+            match = self.semantic_cache.lookup(scope, embedding)
+            if match:
+                return match[0]
+        return None
+    
+    async def store_cached_response(self, scope, user_message, response, embeddings):
+        """Cache a generated reply in both tiers"""
+        self.response_cache.put(ResponseCache.make_key(scope, user_message), response)
+        if self.semantic_cache is None:
+            return
+        
+        embedding = embeddings.get(user_message)
+        if embedding is None:
+            embedding = await self.get_embedding(user_message)
+        if embedding:
+            self.semantic_cache.put(scope, embedding, response)
+    
+    def get_batch_message(self, batch):
+        """Combine a batch of coalesced messages into one user message"""
+        parts = []
+        for message in batch[-COALESCE_MAX_MESSAGES:]:
+            content = message.content
             
-            # Make the request in a thread to avoid blocking
-            loop = asyncio.get_event_loop()
-            response = await loop.run_in_executor(
-                None, 
-                lambda: requests.post(url, json=payload, timeout=30)
-            )
+            # Remove bot mention if present
+            if self.user.mentioned_in(message):
+                content = content.replace(f'<@{self.user.id}>', '').strip()
             
-            if response.status_code == 200:
-                data = response.json()
-                return data.get('response', '').strip()
-            else:
-                print(f"Ollama API error: {response.status_code} - {response.text}")
-                return None
+            if len(batch) > 1:
+                content = f"{message.author.display_name}: {content}"
+            parts.append(content)
+        return "\n".join(parts)
+    
+    async def send_chunks(self, message, response, max_length):
+        """Reply with a response, split if it's too long for Discord"""
+        chunks = [response[i:i+max_length] for i in range(0, len(response), max_length)]
+        for chunk in chunks:
+            await self.send_reply(message, chunk)
+    
+    async def send_reply(self, message, content):
+        """Reply to a message, falling back to a plain channel send"""
+        with metrics.DISCORD_SEND.time(action='reply'), tracing.span('reply', length=len(content)):
+            try:
+                return await message.reply(content)
+            except discord.errors.HTTPException:
+                # Fallback to regular send if reply fails
+                return await message.channel.send(content)
+    
+    async def edit_reply(self, reply, content):
+        """Edit a reply in place"""
+        with metrics.DISCORD_SEND.time(action='edit'), tracing.span('edit', length=len(content)):
+            await reply.edit(content=content)
+    
+    async def stream_reply(self, message, prompt, max_length, route_key=None, model=None):
+        """Stream an Ollama response into a single, progressively edited reply, returns (response, complete)"""
+        loop = asyncio.get_event_loop()
+        model = model or self.ollama.model
+        complete = False
+        parts = []
+        reply = None
+        last_edit = 0.0
+        start = time.perf_counter()
+        
+        try:
+            async for token in self.stream_ollama_response(prompt, route_key, model):
+                if not parts:
+                    metrics.TIME_TO_FIRST_TOKEN.observe(time.perf_counter() - start)
+                    tracing.annotate(time_to_first_token_ms=(time.perf_counter() - start) * 1000)
+                parts.append(token)
                 
-        except requests.exceptions.RequestException as e:
-            print(f"Request error: {e}")
+                # Batch edits so we stay inside Discord's rate limits
+                now = loop.time()
+                if now - last_edit < STREAM_EDIT_INTERVAL:
+                    continue
+                preview = "".join(parts).strip()[:max_length]
+                if not preview:
+                    continue
+                
+                if reply is None:
+                    reply = await self.send_reply(message, preview)
+                else:
+                    await self.edit_reply(reply, preview)
+                last_edit = loop.time()
+            self.router.record(model, time.perf_counter() - start)
+            complete = True
+        except Exception as e:
+            # Keep whatever was streamed before the failure
+            metrics.ERRORS.inc(kind='stream')
+            self.router.record_failure(model)
+            print(f"Streaming error: {e}")
+        
+        response = "".join(parts).strip()
+        if not response:
+            return None, False
+        
+        # Final edit with the complete text, overflow goes into follow-up replies
+        chunks = [response[i:i+max_length] for i in range(0, len(response), max_length)]
+        if reply is None:
+            await self.send_reply(message, chunks[0])
+        elif reply.content != chunks[0]:
+            await self.edit_reply(reply, chunks[0])
+        for chunk in chunks[1:]:
+            await self.send_reply(message, chunk)
+        
+        return response, complete
+    
+    def generation_client(self):
+        """Get the worker broker when workers are connected, else the in-process client"""
+        if self.workers is not None and self.workers.available:
+            return self.workers
+        return self.ollama
+    
+    async def stream_ollama_response(self, prompt, route_key=None, model=None):
+        """Yield response tokens from Ollama's streaming API"""
+        client = self.generation_client()
+        done = False
+        if isinstance(prompt, list):
+            async for data in client.stream_chat(prompt, route_key, model):
+                content = data.get('message', {}).get('content')
+                if content:
+                    yield content
+                if data.get('done'):
+                    done = True
+                    tracing.annotate(**tracing.ollama_timings(data))
+        else:
+            async for data in client.stream_generate(prompt, route_key, model):
+                if data.get('response'):
+                    yield data['response']
+                if data.get('done'):
+                    done = True
+                    tracing.annotate(**tracing.ollama_timings(data))
+        if not done:
+            raise OllamaError("Ollama stream ended before the response was done")
+    
+    async def get_ollama_response(self, prompt, route_key=None, model=None):
+        """Get response from Ollama API, prompt is a string or a list of chat messages"""
+        model = model or self.ollama.model
+        key = request_key(model, prompt)
+        if key in self.inflight:
+            # Only waiting on another generation, so free the slot for other guilds' work
+            self.scheduler.release()
+        return await self.inflight.do(key, lambda: self.fetch_ollama_response(prompt, route_key, model))
+    
+    async def fetch_ollama_response(self, prompt, route_key=None, model=None):
+        """Call Ollama for a response, returns None on failure"""
+        client = self.generation_client()
+        model = model or self.ollama.model
+        start = time.perf_counter()
+        try:
+            with tracing.span('ollama', workers=client is self.workers, model=model):
+                if isinstance(prompt, list):
+                    data = await client.chat(prompt, route_key, model)
+                    response = data.get('message', {}).get('content', '')
+                else:
+                    data = await client.generate(prompt, route_key, model)
+                    response = data.get('response', '')
+                tracing.annotate(**tracing.ollama_timings(data))
+            self.router.record(model, time.perf_counter() - start)
+            
+            # Without streaming, Ollama's own timings give the time to first token
+            if 'prompt_eval_duration' in data:
+                metrics.TIME_TO_FIRST_TOKEN.observe((data.get('load_duration', 0) + data['prompt_eval_duration']) / 1e9)
+            return response.strip()
+        
+        except OllamaError as e:
+            metrics.ERRORS.inc(kind='ollama')
+            self.router.record_failure(model)
+            print(e)
+            return None
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            metrics.ERRORS.inc(kind='request')
+            self.router.record_failure(model)
+            print(f"Request error: {e!r}")
             return None
         except Exception as e:
+            metrics.ERRORS.inc(kind='unexpected')
             print(f"Unexpected error: {e}")
             return None
 
@@ -535,17 +1045,69 @@ def setup_commands(bot):
     @bot.command(name='ollama_status')
     async def ollama_status(ctx):
         """Check Ollama connection status"""
-        try:
-            url = f"{OLLAMA_BASE_URL}/api/tags"
-            response = requests.get(url, timeout=5)
-            if response.status_code == 200:
-                models = response.json().get('models', [])
-                model_names = [model['name'] for model in models]
-                await ctx.send(f"✅ Ollama is running!\nAvailable models: {', '.join(model_names)}")
+        lines = []
+        for backend in bot.ollama.backends:
+            try:
+                model_names = await bot.ollama.list_models(backend)
+                lines.append(f"✅ {backend.url} is running!\nAvailable models: {', '.join(model_names)}")
+            except OllamaError:
+                lines.append(f"❌ {backend.url} is not responding properly")
+            except Exception as e:
+                lines.append(f"❌ Cannot connect to {backend.url}: {str(e)}")
+            
+            for model in bot.warm_models:
+                state = backend.model_state.get(model, 'unknown')
+                load_seconds = backend.load_seconds.get(model)
+                last_load = f" (last load took {load_seconds:.1f}s)" if load_seconds is not None else ""
+                lines.append(f"Model {model}: {state}{last_load}")
+            
+            if len(bot.ollama.backends) > 1:
+                status = backend.status()
+                latency = f"{status['latency_ms']:.0f}ms" if status['latency_ms'] is not None else "n/a"
+                lines.append(f"In rotation: {'yes' if status['healthy'] else 'no'} | "
+                             f"In flight: {status['outstanding']} | Latency: {latency} | "
+                             f"Requests: {status['requests']} | Failures: {status['failures']}")
+        
+        if bot.router.fast_model is not None:
+            lines.append("🔀 Model routing")
+            for stats in bot.router.status():
+                latency = f"{stats['latency_ms']:.0f}ms" if stats['latency_ms'] is not None else "n/a"
+                available = "" if stats['available'] else " | Skipped after failures"
+                lines.append(f"{stats['model']} ({stats['role']}): Average: {latency} | "
+                             f"Requests: {stats['requests']} | Failures: {stats['failures']}{available}")
+        
+        if bot.workers is not None:
+            workers = bot.workers.status()
+            if workers:
+                lines.append(f"🧵 {len(workers)} generation workers connected")
+                for worker in workers:
+                    lines.append(f"{worker['name']}: {worker['active']}/{worker['slots']} busy | "
+                                 f"Completed: {worker['completed']}")
             else:
-                await ctx.send("❌ Ollama is not responding properly")
-        except Exception as e:
-            await ctx.send(f"❌ Cannot connect to Ollama: {str(e)}")
+                lines.append("🧵 No generation workers connected, generating in-process")
+        await ctx.send("\n".join(lines))
+
+    @bot.command(name='cache_stats')
+    async def cache_stats(ctx):
+        """Show response cache counters"""
+        stats = bot.response_cache.stats()
+        await ctx.send(
+            f"🗃️ Response cache: {stats['size']}/{stats['max_size']} entries, TTL {stats['ttl']}s\n"
+            f"Hits: {stats['hits']} | Misses: {stats['misses']} | Hit rate: {stats['hit_rate']*100:.1f}%\n"
+            f"Evictions: {stats['evictions']} | Expirations: {stats['expirations']}"
+        )
+        if bot.semantic_cache is not None:
+            stats = bot.semantic_cache.stats()
+            await ctx.send(
+                f"🧲 Semantic cache: {stats['size']}/{stats['max_size']} entries, threshold {stats['threshold']}, TTL {stats['ttl']}s\n"
+                f"Hits: {stats['hits']} | Misses: {stats['misses']} | Hit rate: {stats['hit_rate']*100:.1f}%\n"
+                f"Evictions: {stats['evictions']}"
+            )
+        stats = bot.inflight.stats()
+        await ctx.send(
+            f"✈️ In-flight generations: {stats['in_flight']} | "
+            f"Started: {stats['started']} | Shared with identical requests: {stats['shared']}"
+        )
 
     @bot.command(name='help')
     async def help_command(ctx):
@@ -564,6 +1126,7 @@ def setup_commands(bot):
             name="Basic Commands",
             value=f"`{BOT_PREFIX}ping` - Check bot latency\n"
                   f"`{BOT_PREFIX}ollama_status` - Check Ollama connection\n"
+                  f"`{BOT_PREFIX}cache_stats` - Show response cache counters\n"
                   f"`{BOT_PREFIX}help` - Show this help message",
             inline=False
         )
@@ -574,6 +1137,8 @@ def setup_commands(bot):
                   f"`{BOT_PREFIX}policy cooldown <seconds>` - Set cooldown\n"
                   f"`{BOT_PREFIX}policy admin_only <true/false>` - Admin only mode\n"
                   f"`{BOT_PREFIX}policy require_mention <true/false>` - Require mentions\n"
+                  f"`{BOT_PREFIX}policy response_cache <true/false>` - Reuse replies to repeated messages\n"
+                  f"`{BOT_PREFIX}policy model <auto/fast/main>` - Pick the fast or main model, or route automatically\n"
                   f"`{BOT_PREFIX}policy channels allow/block <#channel>` - Channel restrictions\n"
                   f"`{BOT_PREFIX}policy roles allow/block <@role>` - Role restrictions",
             inline=False
@@ -588,22 +1153,36 @@ def setup_commands(bot):
                   f"`{BOT_PREFIX}personality helpfulness <low/medium/high>` - Set helpfulness\n"
                   f"`{BOT_PREFIX}personality creativity <low/medium/high>` - Set creativity\n"
                   f"`{BOT_PREFIX}personality temperature <0.0-2.0>` - Set response creativity\n"
-                  f"`{BOT_PREFIX}personality context enable/disable` - Enable/disable memory\n"
+                  f"`{BOT_PREFIX}personality reload_policy` - Reload base policy from file\n"
+                  f"`{BOT_PREFIX}personality reset` - Reset to defaults\n"
+                  f"`{BOT_PREFIX}personality clear` - Clear all personality (neutral AI)",
+            inline=False
+        )
+        # Discord caps embed fields at 1024 characters, so memory and auto-reply get their own
+        embed.add_field(
+            name="Memory & Auto-Reply Commands (Admin Only)",
+            value=f"`{BOT_PREFIX}personality context enable/disable` - Enable/disable memory\n"
                   f"`{BOT_PREFIX}personality context length <1-50>` - Set memory length\n"
-                  f"`{BOT_PREFIX}personality context clear` - Clear all memory\n"
+                  f"`{BOT_PREFIX}personality context usage` - Show channel memory budget usage\n"
+                  f"`{BOT_PREFIX}personality context clear` - Clear this server's memory\n"
                   f"`{BOT_PREFIX}personality context_channel clear` - Clear channel memory\n"
                   f"`{BOT_PREFIX}personality auto_reply enable/disable` - Enable/disable auto-reply\n"
                   f"`{BOT_PREFIX}personality auto_reply probability <0.0-1.0>` - Set reply chance\n"
                   f"`{BOT_PREFIX}personality auto_reply cooldown <seconds>` - Set reply cooldown\n"
                   f"`{BOT_PREFIX}personality auto_reply triggers <words>` - Set trigger words\n"
-                  f"`{BOT_PREFIX}personality reload_policy` - Reload base policy from file\n"
-                  f"`{BOT_PREFIX}personality reset` - Reset to defaults\n"
-                  f"`{BOT_PREFIX}personality clear` - Clear all personality (neutral AI)",
+                  f"`{BOT_PREFIX}personality auto_reply whole_words <true/false>` - Match triggers as whole words",
+            inline=False
+        )
+        embed.add_field(
+            name="Personality Scope",
+            value=f"Personality commands change this server's profile\n"
+                  f"`{BOT_PREFIX}personality channel <command>` - Change only this channel's profile\n"
+                  f"`{BOT_PREFIX}personality global <command>` - Change the default for every server (bot owner)",
             inline=False
         )
         embed.add_field(
             name="Model Info",
-            value=f"Using model: {OLLAMA_MODEL}\nOllama URL: {OLLAMA_BASE_URL}",
+            value=f"Using model: {OLLAMA_MODEL}\nOllama URLs: {', '.join(OLLAMA_BASE_URLS)}",
             inline=False
         )
         await ctx.send(embed=embed)
@@ -642,6 +1221,16 @@ def setup_commands(bot):
                 value=f"{policy['cooldown_seconds']} seconds",
                 inline=True
             )
+            embed.add_field(
+                name="Response Cache",
+                value="✅ Yes" if policy['response_cache'] else "❌ No",
+                inline=True
+            )
+            embed.add_field(
+                name="Model",
+                value=policy['model_route'],
+                inline=True
+            )
             embed.add_field(
                 name="Max Message Length",
                 value=f"{policy['max_message_length']} characters",
@@ -672,11 +1261,11 @@ def setup_commands(bot):
     
         # Handle policy updates
         if action == "enable":
-            bot.update_server_policy(ctx.guild.id, enabled=True)
+            await bot.update_server_policy(ctx.guild.id, enabled=True)
             await ctx.send("✅ Bot enabled for this server.")
         
         elif action == "disable":
-            bot.update_server_policy(ctx.guild.id, enabled=False)
+            await bot.update_server_policy(ctx.guild.id, enabled=False)
             await ctx.send("❌ Bot disabled for this server.")
         
         elif action == "cooldown":
@@ -684,7 +1273,7 @@ def setup_commands(bot):
                 await ctx.send("❌ Please provide a valid cooldown in seconds. Example: `!policy cooldown 10`")
                 return
             cooldown = int(args[0])
-            bot.update_server_policy(ctx.guild.id, cooldown_seconds=cooldown)
+            await bot.update_server_policy(ctx.guild.id, cooldown_seconds=cooldown)
             await ctx.send(f"✅ Cooldown set to {cooldown} seconds.")
         
         elif action == "admin_only":
@@ -692,7 +1281,7 @@ def setup_commands(bot):
                 await ctx.send("❌ Please specify true or false. Example: `!policy admin_only true`")
                 return
             admin_only = args[0].lower() == 'true'
-            bot.update_server_policy(ctx.guild.id, admin_only=admin_only)
+            await bot.update_server_policy(ctx.guild.id, admin_only=admin_only)
             await ctx.send(f"✅ Admin only mode {'enabled' if admin_only else 'disabled'}.")
         
         elif action == "require_mention":
@@ -700,9 +1289,28 @@ def setup_commands(bot):
                 await ctx.send("❌ Please specify true or false. Example: `!policy require_mention true`")
                 return
             require_mention = args[0].lower() == 'true'
-            bot.update_server_policy(ctx.guild.id, require_mention=require_mention)
+            await bot.update_server_policy(ctx.guild.id, require_mention=require_mention)
             await ctx.send(f"✅ Require mention {'enabled' if require_mention else 'disabled'}.")
         
+        elif action == "response_cache":
+            if not args or args[0].lower() not in ['true', 'false']:
+                await ctx.send("❌ Please specify true or false. Example: `!policy response_cache true`")
+                return
+            response_cache = args[0].lower() == 'true'
+            await bot.update_server_policy(ctx.guild.id, response_cache=response_cache)
+            await ctx.send(f"✅ Response cache {'enabled' if response_cache else 'disabled'}.")
+        
+        elif action == "model":
+            if not args or args[0].lower() not in ROUTES:
+                await ctx.send("❌ Please specify auto, fast or main. Example: `!policy model fast`")
+                return
+            model_route = args[0].lower()
+            await bot.update_server_policy(ctx.guild.id, model_route=model_route)
+            if model_route != 'main' and bot.router.fast_model is None:
+                await ctx.send(f"✅ Model set to {model_route}. No fast model is configured, so replies use {OLLAMA_MODEL} for now.")
+            else:
+                await ctx.send(f"✅ Model set to {model_route}.")
+        
         elif action == "channels":
             if len(args) < 2:
                 await ctx.send("❌ Usage: `!policy channels allow/block #channel`")
@@ -721,14 +1329,14 @@ def setup_commands(bot):
             
             policy = bot.get_server_policy(ctx.guild.id)
             if sub_action == "allow":
-                allowed = list(set(policy['allowed_channels'] + [str(ch) for ch in channels]))
-                blocked = [ch for ch in policy['blocked_channels'] if ch not in [str(ch) for ch in channels]]
-                bot.update_server_policy(ctx.guild.id, allowed_channels=allowed, blocked_channels=blocked)
+                allowed = list(policy['allowed_channels'] | {str(ch) for ch in channels})
+                blocked = list(policy['blocked_channels'] - {str(ch) for ch in channels})
+                await bot.update_server_policy(ctx.guild.id, allowed_channels=allowed, blocked_channels=blocked)
                 await ctx.send(f"✅ Allowed channels: {', '.join([f'<#{ch}>' for ch in channels])}")
             else:
-                blocked = list(set(policy['blocked_channels'] + [str(ch) for ch in channels]))
-                allowed = [ch for ch in policy['allowed_channels'] if ch not in [str(ch) for ch in channels]]
-                bot.update_server_policy(ctx.guild.id, allowed_channels=allowed, blocked_channels=blocked)
+                blocked = list(policy['blocked_channels'] | {str(ch) for ch in channels})
+                allowed = list(policy['allowed_channels'] - {str(ch) for ch in channels})
+                await bot.update_server_policy(ctx.guild.id, allowed_channels=allowed, blocked_channels=blocked)
                 await ctx.send(f"✅ Blocked channels: {', '.join([f'<#{ch}>' for ch in channels])}")
         
         elif action == "roles":
@@ -749,14 +1357,14 @@ def setup_commands(bot):
             
             policy = bot.get_server_policy(ctx.guild.id)
             if sub_action == "allow":
-                allowed = list(set(policy['allowed_roles'] + [str(role) for role in roles]))
-                blocked = [role for role in policy['blocked_roles'] if role not in [str(role) for role in roles]]
-                bot.update_server_policy(ctx.guild.id, allowed_roles=allowed, blocked_roles=blocked)
+                allowed = list(policy['allowed_roles'] | {str(role) for role in roles})
+                blocked = list(policy['blocked_roles'] - {str(role) for role in roles})
+                await bot.update_server_policy(ctx.guild.id, allowed_roles=allowed, blocked_roles=blocked)
                 await ctx.send(f"✅ Allowed roles: {', '.join([f'<@&{role}>' for role in roles])}")
             else:
-                blocked = list(set(policy['blocked_roles'] + [str(role) for role in roles]))
-                allowed = [role for role in policy['allowed_roles'] if role not in [str(role) for role in roles]]
-                bot.update_server_policy(ctx.guild.id, allowed_roles=allowed, blocked_roles=blocked)
+                blocked = list(policy['blocked_roles'] | {str(role) for role in roles})
+                allowed = list(policy['allowed_roles'] - {str(role) for role in roles})
+                await bot.update_server_policy(ctx.guild.id, allowed_roles=allowed, blocked_roles=blocked)
                 await ctx.send(f"✅ Blocked roles: {', '.join([f'<@&{role}>' for role in roles])}")
         
         else:
@@ -765,17 +1373,43 @@ def setup_commands(bot):
     @bot.command(name='personality')
     async def personality_command(ctx, action=None, *args):
         """Manage AI personality and safety settings (Admin only)"""
-        if not ctx.author.guild_permissions.administrator:
+        # Changes apply to this server, or to one channel or every server when scoped
+        guild_id = ctx.guild.id if ctx.guild else None
+        channel_id = None
+        if action == "channel":
+            if ctx.guild is None:
+                await ctx.send("❌ Channel personalities can only be set in a server.")
+                return
+            channel_id = ctx.channel.id
+        elif action == "global":
+            guild_id = None
+        if action in ("channel", "global"):
+            action, args = (args[0], args[1:]) if args else (None, ())
+        scope = "this channel" if channel_id is not None else "this server" if guild_id is not None else "all servers"
+        
+        if guild_id is None:
+            if not await bot.is_owner(ctx.author):
+                await ctx.send("❌ Only the bot owner can manage the global AI personality.")
+                return
+        elif not ctx.author.guild_permissions.administrator:
             await ctx.send("❌ You need administrator permissions to manage AI personality.")
             return
         
         if not action:
-            # Show current personality settings
-            settings = bot.personality_settings
+            # Show the personality settings in effect for the scope
+            if guild_id is not None:
+                await bot.personalities.ensure_loaded(guild_id)
+            profile = bot.personalities.get(guild_id, channel_id)
+            settings = profile.settings
             embed = discord.Embed(
-                title="🤖 AI Personality Settings",
+                title=f"🤖 AI Personality Settings ({scope})",
                 color=0xff6b6b
             )
+            embed.add_field(
+                name="Profile",
+                value={'global': "Global default", 'guild': "Server profile", 'channel': "Channel profile"}[profile.scope],
+                inline=False
+            )
             embed.add_field(
                 name="System Prompt",
                 value=settings['system_prompt'][:100] + "..." if len(settings['system_prompt']) > 100 else settings['system_prompt'],
@@ -806,6 +1440,11 @@ def setup_commands(bot):
                 value=f"{settings['context_length']} messages",
                 inline=True
             )
+            embed.add_field(
+                name="Context Budget",
+                value=f"{bot.conversation_context.token_budget} tokens",
+                inline=True
+            )
             embed.add_field(
                 name="Auto-Reply",
                 value="✅ Enabled" if settings['auto_reply_enabled'] else "❌ Disabled",
@@ -822,9 +1461,12 @@ def setup_commands(bot):
                 inline=True
             )
             if settings['auto_reply_trigger_words']:
+                trigger_words = settings['auto_reply_trigger_words']
+                matching = "whole words" if settings.get('auto_reply_whole_words') else "anywhere in a message"
+                trigger_list = ", ".join(trigger_words)
                 embed.add_field(
-                    name="Trigger Words",
-                    value=", ".join(settings['auto_reply_trigger_words']),
+                    name=f"Trigger Words ({len(trigger_words)}, {matching})",
+                    value=trigger_list if len(trigger_list) <= 1024 else trigger_list[:1021] + "...",
                     inline=False
                 )
             
@@ -859,7 +1501,7 @@ def setup_commands(bot):
                 await ctx.send("❌ Please provide a new system prompt. Example: `!personality prompt You are a helpful coding assistant.`")
                 return
             new_prompt = " ".join(args)
-            bot.update_personality(system_prompt=new_prompt)
+            await bot.update_personality(guild_id, channel_id, system_prompt=new_prompt)
             await ctx.send(f"✅ System prompt updated: {new_prompt[:100]}...")
         
         elif action == "safety":
@@ -867,7 +1509,7 @@ def setup_commands(bot):
                 await ctx.send("❌ Please specify safety level: strict, moderate, or permissive")
                 return
             safety_level = args[0].lower()
-            bot.update_personality(safety_level=safety_level)
+            await bot.update_personality(guild_id, channel_id, safety_level=safety_level)
             await ctx.send(f"✅ Safety level set to: {safety_level.title()}")
         
         elif action == "formality":
@@ -875,7 +1517,7 @@ def setup_commands(bot):
                 await ctx.send("❌ Please specify formality: formal, casual, or friendly")
                 return
             formality = args[0].lower()
-            bot.update_personality(personality_traits={'formality': formality})
+            await bot.update_personality(guild_id, channel_id, personality_traits={'formality': formality})
             await ctx.send(f"✅ Formality set to: {formality.title()}")
         
         elif action == "humor":
@@ -883,7 +1525,7 @@ def setup_commands(bot):
                 await ctx.send("❌ Please specify humor level: none, light, moderate, or heavy")
                 return
             humor = args[0].lower()
-            bot.update_personality(personality_traits={'humor': humor})
+            await bot.update_personality(guild_id, channel_id, personality_traits={'humor': humor})
             await ctx.send(f"✅ Humor level set to: {humor.title()}")
         
         elif action == "helpfulness":
@@ -891,7 +1533,7 @@ def setup_commands(bot):
                 await ctx.send("❌ Please specify helpfulness: low, medium, or high")
                 return
             helpfulness = args[0].lower()
-            bot.update_personality(personality_traits={'helpfulness': helpfulness})
+            await bot.update_personality(guild_id, channel_id, personality_traits={'helpfulness': helpfulness})
             await ctx.send(f"✅ Helpfulness set to: {helpfulness.title()}")
         
         elif action == "creativity":
@@ -899,7 +1541,7 @@ def setup_commands(bot):
                 await ctx.send("❌ Please specify creativity: low, medium, or high")
                 return
             creativity = args[0].lower()
-            bot.update_personality(personality_traits={'creativity': creativity})
+            await bot.update_personality(guild_id, channel_id, personality_traits={'creativity': creativity})
             await ctx.send(f"✅ Creativity set to: {creativity.title()}")
         
         elif action == "temperature":
@@ -910,61 +1552,37 @@ def setup_commands(bot):
             if not 0.0 <= temperature <= 2.0:
                 await ctx.send("❌ Temperature must be between 0.0 and 2.0")
                 return
-            bot.update_personality(temperature=temperature)
+            await bot.update_personality(guild_id, channel_id, temperature=temperature)
             await ctx.send(f"✅ Temperature set to: {temperature}")
         
         elif action == "reset":
             # Reset to default personality
-            bot.load_base_policy()  # Reload base policy from file
-            bot.personality_settings = {
-                'system_prompt': bot.base_policy,
-                'safety_level': 'moderate',
-                'max_response_length': 2000,
-                'temperature': 0.7,
-                'context_length': 10,
-                'context_enabled': True,
-                'auto_reply_enabled': True,
-                'auto_reply_trigger_words': [],
-                'auto_reply_probability': 1.0,
-                'auto_reply_cooldown': 10,
-                'personality_traits': {
-                    'formality': 'casual',
-                    'humor': 'light',
-                    'helpfulness': 'high',
-                    'creativity': 'medium'
-                }
-            }
-            await ctx.send("✅ Personality reset to defaults")
+            if guild_id is None:
+                bot.load_base_policy()  # Reload base policy from file
+                await bot.set_personality(None, None, default_personality(bot.base_policy))
+                await ctx.send(f"✅ Personality reset to defaults for {scope}")
+            else:
+                # Dropping the profile makes the scope follow the global personality again
+                await bot.set_personality(guild_id, channel_id, None)
+                await ctx.send(f"✅ Personality reset to the global defaults for {scope}. "
+                               f"Use `{BOT_PREFIX}personality reload_policy` to pick up changes to base_policy.txt")
         
         elif action == "clear":
             # Clear all personality settings - minimal AI
-            bot.personality_settings = {
-                'system_prompt': "You are an AI assistant.",
-                'safety_level': 'moderate',
-                'max_response_length': 2000,
-                'temperature': 0.7,
-                'context_length': 10,
-                'context_enabled': True,
-                'personality_traits': {
-                    'formality': 'casual',
-                    'humor': 'none',
-                    'helpfulness': 'medium',
-                    'creativity': 'low'
-                }
-            }
-            await ctx.send("🧹 All personality settings cleared! AI will now respond neutrally.")
+            await bot.set_personality(guild_id, channel_id, neutral_personality())
+            await ctx.send(f"🧹 All personality settings cleared for {scope}! AI will now respond neutrally.")
         
         elif action == "context":
             if not args:
-                await ctx.send("❌ Usage: `!personality context <enable/disable/length/clear>`")
+                await ctx.send("❌ Usage: `!personality context <enable/disable/length/usage/clear>`")
                 return
             
             sub_action = args[0].lower()
             if sub_action == "enable":
-                bot.update_personality(context_enabled=True)
+                await bot.update_personality(guild_id, channel_id, context_enabled=True)
                 await ctx.send("✅ Context memory enabled")
             elif sub_action == "disable":
-                bot.update_personality(context_enabled=False)
+                await bot.update_personality(guild_id, channel_id, context_enabled=False)
                 await ctx.send("❌ Context memory disabled")
             elif sub_action == "length":
                 if len(args) < 2 or not args[1].isdigit():
@@ -974,13 +1592,21 @@ def setup_commands(bot):
                 if length < 0 or length > 50:
                     await ctx.send("❌ Context length must be between 0 and 50")
                     return
-                bot.update_personality(context_length=length)
+                await bot.update_personality(guild_id, channel_id, context_length=length)
                 await ctx.send(f"✅ Context length set to {length} messages")
             elif sub_action == "clear":
-                bot.clear_context()
-                await ctx.send("🧹 All conversation context cleared")
+                if guild_id is None:
+                    bot.clear_context()
+                elif channel_id is not None:
+                    bot.clear_context(channel_id)
+                else:
+                    bot.clear_guild_context(ctx.guild)
+                await ctx.send(f"🧹 Conversation context cleared for {scope}")
+            elif sub_action == "usage":
+                turns, tokens, budget = bot.conversation_context.usage(ctx.channel.id)
+                await ctx.send(f"🧠 This channel's memory: {turns} messages, ~{tokens}/{budget} tokens ({tokens / budget * 100:.0f}% of budget)")
             else:
-                await ctx.send("❌ Use: enable, disable, length, or clear")
+                await ctx.send("❌ Use: enable, disable, length, usage, or clear")
         
         elif action == "context_channel":
             if not args or args[0].lower() not in ['clear']:
@@ -991,15 +1617,15 @@ def setup_commands(bot):
         
         elif action == "auto_reply":
             if not args:
-                await ctx.send("❌ Usage: `!personality auto_reply <enable/disable/probability/cooldown/triggers>`")
+                await ctx.send("❌ Usage: `!personality auto_reply <enable/disable/probability/cooldown/triggers/whole_words>`")
                 return
             
             sub_action = args[0].lower()
             if sub_action == "enable":
-                bot.update_personality(auto_reply_enabled=True)
+                await bot.update_personality(guild_id, channel_id, auto_reply_enabled=True)
                 await ctx.send("✅ Auto-reply enabled - Bot will respond without mentions")
             elif sub_action == "disable":
-                bot.update_personality(auto_reply_enabled=False)
+                await bot.update_personality(guild_id, channel_id, auto_reply_enabled=False)
                 await ctx.send("❌ Auto-reply disabled - Bot only responds to mentions")
             elif sub_action == "probability":
                 if len(args) < 2:
@@ -1010,7 +1636,7 @@ def setup_commands(bot):
                     if not 0.0 <= prob <= 1.0:
                         await ctx.send("❌ Probability must be between 0.0 and 1.0")
                         return
-                    bot.update_personality(auto_reply_probability=prob)
+                    await bot.update_personality(guild_id, channel_id, auto_reply_probability=prob)
                     await ctx.send(f"✅ Auto-reply probability set to {prob} ({prob*100:.0f}%)")
                 except ValueError:
                     await ctx.send("❌ Please provide a valid number")
@@ -1022,26 +1648,36 @@ def setup_commands(bot):
                 if cooldown < 0:
                     await ctx.send("❌ Cooldown must be 0 or higher")
                     return
-                bot.update_personality(auto_reply_cooldown=cooldown)
+                await bot.update_personality(guild_id, channel_id, auto_reply_cooldown=cooldown)
                 await ctx.send(f"✅ Auto-reply cooldown set to {cooldown} seconds")
             elif sub_action == "triggers":
                 if len(args) < 2:
                     await ctx.send("❌ Usage: `!personality auto_reply triggers <words>` or `!personality auto_reply triggers clear`")
                     return
                 if args[1].lower() == "clear":
-                    bot.update_personality(auto_reply_trigger_words=[])
+                    await bot.update_personality(guild_id, channel_id, auto_reply_trigger_words=[])
                     await ctx.send("🧹 Auto-reply trigger words cleared")
                 else:
-                    triggers = args[1:]
-                    bot.update_personality(auto_reply_trigger_words=triggers)
+                    triggers = list(args[1:])
+                    await bot.update_personality(guild_id, channel_id, auto_reply_trigger_words=triggers)
                     await ctx.send(f"✅ Auto-reply trigger words set to: {', '.join(triggers)}")
+            elif sub_action == "whole_words":
+                if len(args) < 2 or args[1].lower() not in ['true', 'false']:
+                    await ctx.send("❌ Usage: `!personality auto_reply whole_words <true/false>`")
+                    return
+                whole_words = args[1].lower() == 'true'
+                await bot.update_personality(guild_id, channel_id, auto_reply_whole_words=whole_words)
+                if whole_words:
+                    await ctx.send("✅ Trigger words now only match as whole words")
+                else:
+                    await ctx.send("✅ Trigger words now match anywhere in a message")
             else:
-                await ctx.send("❌ Use: enable, disable, probability, cooldown, or triggers")
+                await ctx.send("❌ Use: enable, disable, probability, cooldown, triggers, or whole_words")
         
         elif action == "reload_policy":
             # Reload base policy from file
             bot.load_base_policy()
-            bot.update_personality(system_prompt=bot.base_policy)
+            await bot.update_personality(guild_id, channel_id, system_prompt=bot.base_policy)
             await ctx.send("🔄 Base policy reloaded from base_policy.txt")
         
         else:
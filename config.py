@@ -8,13 +8,87 @@ load_dotenv()
 DISCORD_TOKEN = os.getenv('DISCORD_TOKEN')
 BOT_PREFIX = os.getenv('BOT_PREFIX', '!')
 
+# Sharding Configuration (set by launcher.py, or by hand for a single sharded process)
+SHARD_COUNT = int(os.getenv('SHARD_COUNT')) if os.getenv('SHARD_COUNT') else None
+SHARD_IDS = [int(shard) for shard in os.getenv('SHARD_IDS').split(',')] if os.getenv('SHARD_IDS') else None
+SHARDED = SHARD_COUNT is not None or SHARD_IDS is not None
+STATE_POLL_INTERVAL = float(os.getenv('STATE_POLL_INTERVAL', '2'))  # Seconds between checks for changes by other processes
+
 # Ollama Configuration
 OLLAMA_BASE_URL = os.getenv('OLLAMA_BASE_URL', 'http://localhost:11434')
+OLLAMA_BASE_URLS = [url.strip() for url in os.getenv('OLLAMA_BASE_URLS', OLLAMA_BASE_URL).split(',') if url.strip()]
+OLLAMA_BALANCE = os.getenv('OLLAMA_BALANCE', 'least_outstanding')  # least_outstanding or latency
+OLLAMA_HEALTH_INTERVAL = float(os.getenv('OLLAMA_HEALTH_INTERVAL', '15'))  # Seconds between backend health checks
 OLLAMA_MODEL = os.getenv('OLLAMA_MODEL', 'mistral:7b-instruct-q4_0')
+OLLAMA_FAST_MODEL = os.getenv('OLLAMA_FAST_MODEL', '')  # Small model for short messages and load spikes, empty disables routing
+ROUTER_SHORT_MESSAGE = int(os.getenv('ROUTER_SHORT_MESSAGE', '200'))  # Messages up to this many characters may use the fast model
+ROUTER_MAX_CONTEXT_TOKENS = int(os.getenv('ROUTER_MAX_CONTEXT_TOKENS', '512'))  # Prompts with more history go to the main model
+ROUTER_QUEUE_THRESHOLD = int(os.getenv('ROUTER_QUEUE_THRESHOLD', '4'))  # Queued generations that downgrade everything to the fast model, 0 disables
+ROUTER_LATENCY_TARGET = float(os.getenv('ROUTER_LATENCY_TARGET', '0'))  # Downgrade while the main model averages more seconds than this, 0 disables
+OLLAMA_POOL_SIZE = int(os.getenv('OLLAMA_POOL_SIZE', '8'))  # Max pooled connections
+OLLAMA_CONNECT_TIMEOUT = float(os.getenv('OLLAMA_CONNECT_TIMEOUT', '5'))
+OLLAMA_READ_TIMEOUT = float(os.getenv('OLLAMA_READ_TIMEOUT', '30'))
+OLLAMA_KEEPALIVE_TIMEOUT = float(os.getenv('OLLAMA_KEEPALIVE_TIMEOUT', '60'))  # Idle connection lifetime
+OLLAMA_USE_CHAT = os.getenv('OLLAMA_USE_CHAT', 'false').lower() == 'true'  # Use /api/chat instead of /api/generate
+OLLAMA_KEEP_ALIVE = os.getenv('OLLAMA_KEEP_ALIVE', '30m')  # How long Ollama keeps the model loaded, empty for server default
+OLLAMA_WARMUP = os.getenv('OLLAMA_WARMUP', 'true').lower() == 'true'  # Load the model on every backend at startup
+OLLAMA_LOAD_TIMEOUT = float(os.getenv('OLLAMA_LOAD_TIMEOUT', '300'))  # Seconds to wait for a cold model to load
+OLLAMA_KEEP_WARM_INTERVAL = float(os.getenv('OLLAMA_KEEP_WARM_INTERVAL', '120'))  # Seconds between keep-alive pings, 0 disables
+OLLAMA_KEEP_WARM_IDLE = float(os.getenv('OLLAMA_KEEP_WARM_IDLE', '1800'))  # Stop pinging after this long without messages
 
 # Bot Settings
 MAX_MESSAGE_LENGTH = int(os.getenv('MAX_MESSAGE_LENGTH', '2000'))
 
+# Context Settings
+CONTEXT_TOKEN_BUDGET = int(os.getenv('CONTEXT_TOKEN_BUDGET', '2048'))  # Approximate tokens of history kept per channel
+CONTEXT_PERSIST = os.getenv('CONTEXT_PERSIST', 'true').lower() == 'true'  # Save history across restarts
+CONTEXT_MAX_CHANNELS = int(os.getenv('CONTEXT_MAX_CHANNELS', '1000'))  # Channels kept in memory
+CONTEXT_FLUSH_INTERVAL = float(os.getenv('CONTEXT_FLUSH_INTERVAL', '5'))  # Seconds between database writes
+
+# Personality Settings
+PERSONALITY_CACHE_SIZE = int(os.getenv('PERSONALITY_CACHE_SIZE', '1000'))  # Guilds whose personality profiles are kept in memory
+
+# Response Cache Settings (enabled per server with !policy response_cache)
+RESPONSE_CACHE_SIZE = int(os.getenv('RESPONSE_CACHE_SIZE', '1000'))  # Max cached replies
+RESPONSE_CACHE_TTL = float(os.getenv('RESPONSE_CACHE_TTL', '600'))  # Seconds a cached reply stays valid
+RESPONSE_CACHE_CONTEXT_TURNS = int(os.getenv('RESPONSE_CACHE_CONTEXT_TURNS', '1'))  # Recent turns included in the cache key
+
+# Semantic Cache Settings (second tier for near-duplicate messages)
+SEMANTIC_CACHE_ENABLED = os.getenv('SEMANTIC_CACHE_ENABLED', 'false').lower() == 'true'
+OLLAMA_EMBED_MODEL = os.getenv('OLLAMA_EMBED_MODEL', 'nomic-embed-text')
+SEMANTIC_CACHE_SIZE = int(os.getenv('SEMANTIC_CACHE_SIZE', '2000'))  # Max cached prompts in the vector index
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv('SEMANTIC_CACHE_THRESHOLD', '0.92'))  # Minimum cosine similarity for a hit
+
+# Generation Queue Settings
+OLLAMA_PARALLEL = int(os.getenv('OLLAMA_PARALLEL', '4'))  # Match Ollama's OLLAMA_NUM_PARALLEL
+GENERATION_QUEUE_SIZE = int(os.getenv('GENERATION_QUEUE_SIZE', '50'))  # Waiting jobs before replying busy
+
+# Message Coalescing Settings
+COALESCE_MESSAGES = os.getenv('COALESCE_MESSAGES', 'true').lower() == 'true'  # Fold bursts into one reply
+COALESCE_WINDOW = float(os.getenv('COALESCE_WINDOW', '0'))  # Seconds to wait for more messages before queueing
+COALESCE_MAX_MESSAGES = int(os.getenv('COALESCE_MAX_MESSAGES', '10'))  # Newest messages kept in a folded prompt
+
+# Cooldown Settings
+COOLDOWN_PERSIST = os.getenv('COOLDOWN_PERSIST', 'true').lower() == 'true'  # Save cooldowns across restarts
+COOLDOWN_FLUSH_INTERVAL = float(os.getenv('COOLDOWN_FLUSH_INTERVAL', '30'))  # Seconds between janitor runs
+
+# Worker Settings
+WORKER_ADDRESS = os.getenv('WORKER_ADDRESS', '')  # host:port for worker.py processes, empty runs generation in-process
+WORKER_JOB_TIMEOUT = float(os.getenv('WORKER_JOB_TIMEOUT', os.getenv('OLLAMA_READ_TIMEOUT', '30')))  # Seconds without a message from a worker before its job fails
+
+# Metrics Settings
+METRICS_PORT = int(os.getenv('METRICS_PORT', '0'))  # Port for the Prometheus /metrics endpoint, 0 disables it
+METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+
+# Tracing Settings
+TRACE_FILE = os.getenv('TRACE_FILE', '')  # JSONL file for per-message spans, empty disables tracing
+TRACE_SAMPLE_RATE = float(os.getenv('TRACE_SAMPLE_RATE', '1.0'))  # Fraction of messages traced
+TRACE_FLUSH_INTERVAL = float(os.getenv('TRACE_FLUSH_INTERVAL', '5'))  # Seconds between batched writes
+
+# Streaming Settings
+STREAM_RESPONSES = os.getenv('STREAM_RESPONSES', 'false').lower() == 'true'
+STREAM_EDIT_INTERVAL = float(os.getenv('STREAM_EDIT_INTERVAL', '1.2'))  # Seconds between message edits
+
 # Validate required environment variables
 if not DISCORD_TOKEN:
     raise ValueError("DISCORD_TOKEN environment variable is required!")
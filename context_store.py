@@ -0,0 +1,184 @@
+"""
+Context Store - Token-budgeted conversation history per channel
+"""
+import asyncio
+from collections import OrderedDict, deque
+
+
+def estimate_tokens(text):
+    """Approximate token count, roughly four characters per token"""
+    return len(text) // 4 + 1
+
+
+class ContextStore:
+    def __init__(self, token_budget=2048, db=None, max_channels=1000, retain_turns=50):
+        self.token_budget = token_budget
+        self.db = db  # Shared Database, None keeps history in memory only
+        self.max_channels = max_channels  # Channels kept in memory, least recently used are evicted
+        self.retain_turns = retain_turns  # Turns kept per channel in the database
+        self.channels = OrderedDict()  # channel_id -> deque of turns
+        self.token_counts = {}  # channel_id -> tokens stored for that channel
+        self.pending = []  # Ordered ('append', row) / ('clear', channel_id) operations
+        self.loading = {}  # channel_id -> future for an in-progress load
+
+    def __contains__(self, channel_id):
+        return channel_id in self.channels
+
+    def _append(self, channel_id, user_message, bot_response, max_turns, block_trim=False):
+        """Append a turn in memory, then trim the oldest turns to fit the limits"""
+        turns = self.channels.get(channel_id)
+        if turns is None:
+            turns = self.channels[channel_id] = deque()
+            self.token_counts[channel_id] = 0
+            self._evict()
+        else:
+            self.channels.move_to_end(channel_id)
+
+        tokens = estimate_tokens(user_message) + estimate_tokens(bot_response)
+        turns.append({
+            'user': user_message,
+            'bot': bot_response,
+            'tokens': tokens
+        })
+        total = self.token_counts[channel_id] + tokens
+
+        if len(turns) > max_turns or total > self.token_budget:
+            # Block trimming drops to half the limits at once, so the history
+            # prefix stays unchanged for the following turns
+            if block_trim:
+                # Never below the newest turn, or small limits would wipe the history every other turn
+                max_turns = max(1, max_turns // 2)
+                max_tokens = max(self.token_budget // 2, min(tokens, self.token_budget))
+            else:
+                max_tokens = self.token_budget
+            while turns and (len(turns) > max_turns or total > max_tokens):
+                total -= turns.popleft()['tokens']
+
+        self.token_counts[channel_id] = total
+
+    def _evict(self):
+        """Drop least recently used channels beyond max_channels from memory"""
+        while len(self.channels) > self.max_channels:
+            channel_id, _ = self.channels.popitem(last=False)
+            self.token_counts.pop(channel_id, None)
+
+    def add(self, channel_id, user_message, bot_response, max_turns, block_trim=False):
+        """Append a turn and queue it for the database"""
+        self._append(channel_id, user_message, bot_response, max_turns, block_trim)
+        if self.db is not None:
+            self.pending.append(('append', (channel_id, user_message, bot_response)))
+
+    def get(self, channel_id):
+        """Get a channel's turns, oldest first"""
+        return self.channels.get(channel_id, ())
+
+    async def ensure_loaded(self, channel_id, max_turns):
+        """Load a channel's history from the database on first use"""
+        if channel_id in self.channels:
+            self.channels.move_to_end(channel_id)
+            return
+        if self.db is None:
+            return
+
+        future = self.loading.get(channel_id)
+        if future is None:
+            future = self.loading[channel_id] = asyncio.ensure_future(self._load(channel_id, max_turns))
+            future.add_done_callback(lambda _: self.loading.pop(channel_id, None))
+        try:
+            await asyncio.shield(future)
+        except Exception as e:
+            print(f"Error loading context for channel {channel_id}: {e}")
+
+    async def _load(self, channel_id, max_turns):
+        """Read a channel's recent turns off the event loop"""
+        # Pending writes go first, in case the channel was evicted before they landed
+        await self.flush()
+
+        # The writer thread keeps this read ordered after the flush
+        rows = await self.db.run(self.read_channel, channel_id, max_turns)
+
+        # A turn added while we were reading means the channel is already live
+        if channel_id in self.channels:
+            return
+        self.channels[channel_id] = deque()
+        self.token_counts[channel_id] = 0
+        self._evict()
+        for user_message, bot_response in rows:
+            self._append(channel_id, user_message, bot_response, max_turns)
+
+    def read_channel(self, channel_id, limit):
+        """Read a channel's newest turns, oldest first (blocking)"""
+        rows = self.db.query('''
+            SELECT user_message, bot_response FROM conversation_context
+            WHERE channel_id = ? ORDER BY id DESC LIMIT ?
+        ''', (channel_id, limit))
+        rows.reverse()
+        return rows
+
+    def take_pending(self):
+        """Take the queued operations, resetting the batch"""
+        pending, self.pending = self.pending, []
+        return pending
+
+    def write_pending(self, pending):
+        """Apply a batch of queued operations to the database (blocking)"""
+        if not pending:
+            return
+
+        touched = set()
+        with self.db.transaction():
+            for operation, value in pending:
+                if operation == 'append':
+                    self.db.execute('''
+                        INSERT INTO conversation_context (channel_id, user_message, bot_response)
+                        VALUES (?, ?, ?)
+                    ''', value)
+                    touched.add(value[0])
+                elif value is None:
+                    self.db.execute('DELETE FROM conversation_context')
+                else:
+                    self.db.execute('DELETE FROM conversation_context WHERE channel_id = ?', (value,))
+
+            # Keep only the newest turns per channel on disk
+            for channel_id in touched:
+                self.db.execute('''
+                    DELETE FROM conversation_context WHERE channel_id = ? AND id <= (
+                        SELECT id FROM conversation_context WHERE channel_id = ?
+                        ORDER BY id DESC LIMIT 1 OFFSET ?
+                    )
+                ''', (channel_id, channel_id, self.retain_turns))
+
+    async def flush(self):
+        """Write queued operations off the event loop"""
+        if self.db is None or not self.pending:
+            return
+        await self.db.run(self.write_pending, self.take_pending())
+
+    def close(self):
+        """Write queued operations before shutdown (blocking)"""
+        if self.db is not None:
+            self.db.call(self.write_pending, self.take_pending())
+
+    def usage(self, channel_id):
+        """Get (turns, tokens used, token budget) for a channel"""
+        return (
+            len(self.channels.get(channel_id, ())),
+            self.token_counts.get(channel_id, 0),
+            self.token_budget
+        )
+
+    def total_tokens(self):
+        """Get the tokens stored across all channels in memory"""
+        return sum(self.token_counts.values())
+
+    def clear(self, channel_id=None, persist=True):
+        """Clear one channel's history, or every channel's"""
+        if channel_id is None:
+            self.channels.clear()
+            self.token_counts.clear()
+        else:
+            self.channels.pop(channel_id, None)
+            self.token_counts.pop(channel_id, None)
+
+        if self.db is not None and persist:
+            self.pending.append(('clear', channel_id))
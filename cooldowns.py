@@ -0,0 +1,129 @@
+"""
+Cooldown Tracker - In-memory per-user cooldowns with batched persistence
+"""
+import heapq
+import time
+from datetime import datetime
+
+
+class CooldownTracker:
+    def __init__(self, db=None):
+        self.db = db  # Shared Database, None keeps cooldowns in memory only
+        self.entries = {}  # (guild_id, user_id) -> (last_used, expires_at), monotonic clock
+        self.expiry_heap = []  # (expires_at, key), stale entries are skipped lazily
+        self.dirty = set()  # Keys touched since the last flush
+        self.expired = set()  # Keys evicted since the last flush
+
+    def __len__(self):
+        return len(self.entries)
+
+    def is_ready(self, guild_id, user_id, cooldown_seconds):
+        """Check if the user's cooldown has elapsed"""
+        if cooldown_seconds <= 0:
+            return True
+
+        entry = self.entries.get((guild_id, user_id))
+        if entry is None:
+            return True
+        return time.monotonic() - entry[0] >= cooldown_seconds
+
+    def touch(self, guild_id, user_id, cooldown_seconds):
+        """Start the user's cooldown now"""
+        key = (guild_id, user_id)
+        now = time.monotonic()
+        expires_at = now + max(cooldown_seconds, 0)
+
+        self.entries[key] = (now, expires_at)
+        heapq.heappush(self.expiry_heap, (expires_at, key))
+
+        if self.db is not None:
+            self.dirty.add(key)
+            self.expired.discard(key)
+
+    def evict_expired(self):
+        """Drop entries whose cooldown has ended, returns the number evicted"""
+        now = time.monotonic()
+        evicted = 0
+
+        while self.expiry_heap and self.expiry_heap[0][0] <= now:
+            expires_at, key = heapq.heappop(self.expiry_heap)
+            entry = self.entries.get(key)
+
+            # Skip heap entries superseded by a later touch. Expiry uses the
+            # cooldown in force when the entry was set.
+            if entry is None or entry[1] != expires_at:
+                continue
+
+            del self.entries[key]
+            evicted += 1
+            if self.db is not None:
+                self.dirty.discard(key)
+                self.expired.add(key)
+
+        return evicted
+
+    def take_pending(self):
+        """Snapshot pending writes as (upserts, deletes) and reset the batch"""
+        now_monotonic = time.monotonic()
+        now_wall = time.time()
+
+        upserts = []
+        for key in self.dirty:
+            last_used = self.entries[key][0]
+            wall_time = now_wall - (now_monotonic - last_used)
+            upserts.append((key[0], key[1], datetime.fromtimestamp(wall_time).isoformat()))
+        deletes = list(self.expired)
+
+        self.dirty = set()
+        self.expired = set()
+        return upserts, deletes
+
+    def write_pending(self, upserts, deletes):
+        """Write a batch to user_cooldowns (blocking, run on the database writer thread)"""
+        if not upserts and not deletes:
+            return
+
+        with self.db.transaction():
+            self.db.executemany('''
+                INSERT OR REPLACE INTO user_cooldowns (guild_id, user_id, last_used)
+                VALUES (?, ?, ?)
+            ''', upserts)
+            self.db.executemany('''
+                DELETE FROM user_cooldowns WHERE guild_id = ? AND user_id = ?
+            ''', deletes)
+
+    def flush(self):
+        """Write all pending changes synchronously"""
+        self.write_pending(*self.take_pending())
+
+    def load(self, get_cooldown_seconds, guild_filter=None):
+        """Restore cooldowns that are still active from user_cooldowns"""
+        results = self.db.query('SELECT guild_id, user_id, last_used FROM user_cooldowns')
+
+        now_monotonic = time.monotonic()
+        now_wall = time.time()
+        stale = []
+
+        for guild_id, user_id, last_used in results:
+            # Guilds served by another process are left for that process
+            if guild_filter is not None and not guild_filter(guild_id):
+                continue
+
+            try:
+                age = now_wall - datetime.fromisoformat(last_used).timestamp()
+            except (TypeError, ValueError):
+                age = None
+
+            cooldown_seconds = get_cooldown_seconds(guild_id)
+            if age is None or age >= cooldown_seconds:
+                stale.append((guild_id, user_id))
+                continue
+
+            key = (guild_id, user_id)
+            last_monotonic = now_monotonic - max(age, 0)
+            expires_at = last_monotonic + cooldown_seconds
+            self.entries[key] = (last_monotonic, expires_at)
+            heapq.heappush(self.expiry_heap, (expires_at, key))
+
+        # Rows that already expired are cleaned up on the next flush
+        self.expired.update(stale)
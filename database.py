@@ -0,0 +1,97 @@
+"""
+Database - Shared SQLite access with long-lived WAL connections and a writer thread
+"""
+import asyncio
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+
+class Database:
+    def __init__(self, path="bot_policies.db", cached_statements=256, busy_timeout=5.0):
+        self.path = path
+        self.cached_statements = cached_statements  # Prepared statements kept per connection
+        self.busy_timeout = busy_timeout  # Seconds to wait on another process's write lock
+        self.local = threading.local()  # One connection per thread
+        self.connections = []
+        self.lock = threading.Lock()
+
+        # One thread runs all off-loop database work, keeping writes in submission order
+        self.writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='db-writer')
+
+    def connection(self):
+        """Get this thread's connection, opening and tuning it on first use"""
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(
+                self.path,
+                timeout=self.busy_timeout,
+                isolation_level=None,  # Autocommit, multi-statement writes use transaction()
+                check_same_thread=False,  # Only so close() can close every thread's connection
+                cached_statements=self.cached_statements
+            )
+            # WAL lets readers run alongside the writer, NORMAL only syncs at checkpoints
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self.local.conn = conn
+            with self.lock:
+                self.connections.append(conn)
+        return conn
+
+    def execute(self, sql, params=()):
+        """Run one statement and return its cursor"""
+        return self.connection().execute(sql, params)
+
+    def executemany(self, sql, rows):
+        """Run one statement for each row of parameters"""
+        return self.connection().executemany(sql, rows)
+
+    def query(self, sql, params=()):
+        """Run a query and return every row"""
+        return self.connection().execute(sql, params).fetchall()
+
+    def query_one(self, sql, params=()):
+        """Run a query and return the first row, or None"""
+        return self.connection().execute(sql, params).fetchone()
+
+    @contextmanager
+    def transaction(self, immediate=False):
+        """Group statements into one transaction, rolled back on error"""
+        conn = self.connection()
+        # IMMEDIATE takes the write lock up front, so read-then-write can't race another process
+        conn.execute('BEGIN IMMEDIATE' if immediate else 'BEGIN')
+        try:
+            yield conn
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+
+    async def run(self, function, *args):
+        """Run database work on the writer thread without blocking the event loop"""
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(self.writer, function, *args)
+
+    def call(self, function, *args):
+        """Run database work on the writer thread and wait for it (blocking)"""
+        return self.writer.submit(function, *args).result()
+
+    def submit(self, function, *args):
+        """Queue database work on the writer thread without waiting for it"""
+        future = self.writer.submit(function, *args)
+        future.add_done_callback(self._report_failure)
+        return future
+
+    @staticmethod
+    def _report_failure(future):
+        if not future.cancelled() and future.exception() is not None:
+            print(f"Database error: {future.exception()}")
+
+    def close(self):
+        """Finish queued work and close every connection"""
+        self.writer.shutdown(wait=True)
+        with self.lock:
+            for conn in self.connections:
+                conn.close()
+            self.connections.clear()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Shard Launcher - Run the bot as several processes, each serving a slice of the gateway shards
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import urllib.request
+from config import DISCORD_TOKEN, OLLAMA_PARALLEL, METRICS_PORT, WORKER_ADDRESS
+from worker_pool import broker_addresses
+
+GATEWAY_URL = "https://discord.com/api/v10/gateway/bot"
+
+
+def recommended_shards():
+    """Ask Discord how many shards the bot should use"""
+    request = urllib.request.Request(GATEWAY_URL, headers={
+        'Authorization': f"Bot {DISCORD_TOKEN}",
+        'User-Agent': "DiscordBot (launcher.py, 1.0)"
+    })
+    with urllib.request.urlopen(request, timeout=10) as response:
+        return json.load(response)['shards']
+
+
+def split_shards(shard_count, processes):
+    """Split the shard ids into contiguous, evenly sized groups"""
+    processes = min(processes, shard_count)
+    groups = []
+    start = 0
+    for index in range(processes):
+        size = shard_count // processes + (1 if index < shard_count % processes else 0)
+        groups.append(list(range(start, start + size)))
+        start += size
+    return groups
+
+
+class ShardProcess:
+    def __init__(self, index, shard_count, shard_ids, parallel, worker_address=None):
+        self.shard_ids = shard_ids
+        self.env = dict(os.environ)
+        self.env['SHARD_COUNT'] = str(shard_count)
+        self.env['SHARD_IDS'] = ','.join(str(shard) for shard in shard_ids)
+        self.env['OLLAMA_PARALLEL'] = str(parallel)
+        if METRICS_PORT:
+            # Each process serves its own /metrics, they can't share one port
+            self.env['METRICS_PORT'] = str(METRICS_PORT + index)
+        if worker_address:
+            self.env['WORKER_ADDRESS'] = worker_address
+        self.process = None
+
+    def start(self):
+        """Start the bot process for this shard group"""
+        print(f"🚀 Starting shards {self.env['SHARD_IDS']}...")
+        self.process = subprocess.Popen([sys.executable, "bot.py"], env=self.env)
+
+    def check(self):
+        """Restart the process if it has exited"""
+        if self.process.poll() is not None:
+            print(f"💥 Shards {self.env['SHARD_IDS']} exited with code {self.process.returncode}, restarting...")
+            self.start()
+
+    def stop(self):
+        """Stop the bot process"""
+        if self.process and self.process.poll() is None:
+            self.process.terminate()
+            self.process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the bot across several sharded processes")
+    parser.add_argument('--shards', type=int, help="Total shard count (default: Discord's recommendation)")
+    parser.add_argument('--processes', type=int, default=os.cpu_count() or 1, help="Bot processes to run")
+    parser.add_argument('--restart-delay', type=float, default=5.0, help="Seconds between crash checks")
+    args = parser.parse_args()
+
+    shard_count = args.shards or recommended_shards()
+    groups = split_shards(shard_count, args.processes)
+
+    # Share the Ollama slots so all processes together keep OLLAMA_PARALLEL in flight
+    parallel = max(OLLAMA_PARALLEL // len(groups), 1)
+
+    print(f"🧩 {shard_count} shards across {len(groups)} processes, {parallel} generations each")
+    print("⏹️  Press Ctrl+C to stop")
+
+    # Likewise for worker brokers, workers started with --brokers connect to every one
+    worker_addresses = broker_addresses(WORKER_ADDRESS, len(groups)) if WORKER_ADDRESS else [None] * len(groups)
+
+    processes = [ShardProcess(index, shard_count, shard_ids, parallel, worker_addresses[index])
+                 for index, shard_ids in enumerate(groups)]
+    for process in processes:
+        process.start()
+
+    try:
+        while True:
+            time.sleep(args.restart_delay)
+            for process in processes:
+                process.check()
+    except KeyboardInterrupt:
+        print("\n🛑 Stopping all shards...")
+        for process in processes:
+            process.stop()
+        print("✅ All shards stopped")
+
+
+if __name__ == "__main__":
+    main()
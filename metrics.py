@@ -0,0 +1,190 @@
+"""
+Metrics - Counters, gauges and histograms exported in the Prometheus text format
+"""
+import bisect
+import time
+from contextlib import contextmanager
+from aiohttp import web
+
+# Seconds, from sub-millisecond cache lookups up to slow generations
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+
+def format_labels(labelnames, labelvalues, extra=None):
+    """Render a {name="value"} label set"""
+    pairs = list(zip(labelnames, labelvalues))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+def format_value(value):
+    """Render a sample value the way Prometheus expects"""
+    if value == float('inf'):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, description, labelnames=()):
+        self.name = name
+        self.description = description
+        self.labelnames = tuple(labelnames)
+
+    def key(self, labels):
+        """Get the label values tuple for keyword labels"""
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def samples(self):
+        """Yield (suffix, label values, extra label, value) for each sample"""
+        raise NotImplementedError
+
+    def render(self):
+        """Render this metric in the Prometheus text format"""
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} {self.kind}"]
+        for suffix, labelvalues, extra, value in self.samples():
+            lines.append(f"{self.name}{suffix}{format_labels(self.labelnames, labelvalues, extra)} {format_value(value)}")
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def __init__(self, name, description, labelnames=()):
+        super().__init__(name, description, labelnames)
+        self.values = {}
+
+    def inc(self, amount=1, **labels):
+        """Add to the counter"""
+        key = self.key(labels)
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def samples(self):
+        for labelvalues, value in self.values.items():
+            yield "", labelvalues, None, value
+
+
+class Gauge(Metric):
+    kind = 'gauge'
+
+    def __init__(self, name, description, labelnames=()):
+        super().__init__(name, description, labelnames)
+        self.values = {}
+        self.function = None
+
+    def set(self, value, **labels):
+        """Set the gauge"""
+        self.values[self.key(labels)] = value
+
+    def set_function(self, function):
+        """Read the value from function() at scrape time instead"""
+        self.function = function
+
+    def samples(self):
+        if self.function is not None:
+            yield "", (), None, self.function()
+            return
+        for labelvalues, value in self.values.items():
+            yield "", labelvalues, None, value
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, description, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, description, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self.series = {}  # label values -> [bucket counts..., sum]
+
+    def observe(self, value, **labels):
+        """Record one observation"""
+        key = self.key(labels)
+        series = self.series.get(key)
+        if series is None:
+            series = self.series[key] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of a with block"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self):
+        for labelvalues, series in self.series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), series):
+                cumulative += count
+                yield "_bucket", labelvalues, ('le', format_value(float(bound))), cumulative
+            yield "_sum", labelvalues, None, series[-1]
+            yield "_count", labelvalues, None, cumulative
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        """Add a metric to the exported set"""
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name, description, labelnames=()):
+        return self.register(Counter(name, description, labelnames))
+
+    def gauge(self, name, description, labelnames=()):
+        return self.register(Gauge(name, description, labelnames))
+
+    def histogram(self, name, description, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, description, labelnames, buckets))
+
+    def render(self):
+        """Render every metric in the Prometheus text format"""
+        return "\n".join(metric.render() for metric in self.metrics) + "\n"
+
+    async def handle_metrics(self, request):
+        """Serve the current metrics to a scraper"""
+        return web.Response(text=self.render(), content_type='text/plain', charset='utf-8')
+
+    async def start_server(self, host, port):
+        """Serve /metrics over HTTP, returns the runner to clean up on shutdown"""
+        app = web.Application()
+        app.router.add_get('/metrics', self.handle_metrics)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, host, port).start()
+        print(f"📈 Metrics available at http://{host}:{port}/metrics")
+        return runner
+
+
+# Bot metrics, shared by every module in the process
+registry = MetricsRegistry()
+
+POLICY_LOOKUP = registry.histogram('bot_policy_lookup_seconds', "Time to look up and check a server policy")
+COOLDOWN_CHECK = registry.histogram('bot_cooldown_check_seconds', "Time to check a user's cooldown")
+PROMPT_BUILD = registry.histogram('bot_prompt_build_seconds', "Time to build the prompt for a generation")
+TIME_TO_FIRST_TOKEN = registry.histogram('bot_ollama_time_to_first_token_seconds', "Time until Ollama produced the first token")
+GENERATION = registry.histogram('bot_generation_seconds', "Total time to generate a reply", ('mode', 'model'))
+DISCORD_SEND = registry.histogram('bot_discord_send_seconds', "Time to send or edit a Discord message", ('action',))
+MODEL_LOAD = registry.histogram('bot_ollama_model_load_seconds', "Time Ollama took to load a model into memory", ('model',))
+
+REPLIES = registry.counter('bot_replies_total', "Replies sent", ('source',))
+REJECTIONS = registry.counter('bot_rejections_total', "Messages not answered because of a policy or load", ('reason',))
+COOLDOWN_HITS = registry.counter('bot_cooldown_hits_total', "Messages dropped because the user was on cooldown")
+ERRORS = registry.counter('bot_errors_total', "Errors while generating or sending replies", ('kind',))
+ROUTES = registry.counter('bot_model_routes_total', "Generations routed to each model", ('model', 'reason'))
+
+IN_FLIGHT = registry.gauge('bot_generations_in_flight', "Generations currently running")
+QUEUE_DEPTH = registry.gauge('bot_generation_queue_depth', "Generations waiting for a slot")
+CONTEXT_TOKENS = registry.gauge('bot_context_tokens', "Approximate tokens of conversation history held in memory")
+CONTEXT_CHANNELS = registry.gauge('bot_context_channels', "Channels with conversation history held in memory")
+MODEL_LOADED = registry.gauge('bot_ollama_model_loaded', "1 while a backend has the model in memory", ('backend', 'model'))
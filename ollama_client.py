@@ -0,0 +1,324 @@
+"""
+Ollama Client - Async HTTP client for the Ollama API
+"""
+import asyncio
+import json
+import time
+from collections import OrderedDict
+import aiohttp
+
+# A load faster than this found the model already in memory
+COLD_LOAD_SECONDS = 0.5
+
+
+def model_name(name):
+    """Normalize a model name the way Ollama lists it, with an explicit tag"""
+    return name if ':' in name else f"{name}:latest"
+
+
+class OllamaError(Exception):
+    """Raised when Ollama returns an error response"""
+
+
+class Backend:
+    def __init__(self, url):
+        self.url = url.rstrip('/')
+        self.healthy = True
+        self.outstanding = 0  # Requests currently in flight
+        self.latency = None  # Moving average of seconds to response headers
+        self.requests = 0
+        self.failures = 0
+        self.model_state = {}  # model -> 'cold', 'loading', 'loaded' or 'error'
+        self.load_seconds = {}  # model -> seconds the last load took
+        self.warming = {}  # model -> task loading it
+
+    def record_latency(self, seconds, weight=0.2):
+        """Fold a new observation into the moving average latency"""
+        if self.latency is None:
+            self.latency = seconds
+        else:
+            self.latency += weight * (seconds - self.latency)
+
+    def status(self):
+        """Get a summary of this backend for status displays"""
+        return {
+            'url': self.url,
+            'healthy': self.healthy,
+            'outstanding': self.outstanding,
+            'latency_ms': self.latency * 1000 if self.latency is not None else None,
+            'requests': self.requests,
+            'failures': self.failures,
+            'models': dict(self.model_state),
+            'load_seconds': dict(self.load_seconds)
+        }
+
+
+class OllamaClient:
+    def __init__(self, base_urls, model, pool_size=8, connect_timeout=5.0,
+                 read_timeout=30.0, keepalive_timeout=60.0, keep_alive=None,
+                 balance='least_outstanding', max_sticky=10000, load_timeout=300.0, embed_models=()):
+        if isinstance(base_urls, str):
+            base_urls = [base_urls]
+        self.backends = [Backend(url) for url in base_urls]
+        self.model = model
+        self.pool_size = pool_size  # Connections per backend
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.keepalive_timeout = keepalive_timeout
+        self.keep_alive = keep_alive  # How long Ollama keeps the model loaded, e.g. "30m"
+        self.load_timeout = load_timeout  # Seconds to wait for a cold model to load
+        self.embed_models = set(embed_models)  # Embedding-only models, Ollama refuses to load them through /api/generate
+        self.balance = balance  # least_outstanding or latency
+        self.max_sticky = max_sticky
+        self.sticky = OrderedDict()  # route key (channel id) -> Backend, least recently used first
+        self.session = None
+
+    @property
+    def base_url(self):
+        return self.backends[0].url
+
+    async def start(self):
+        """Create the shared session with a bounded keep-alive connection pool"""
+        if self.session is not None:
+            return
+
+        connector = aiohttp.TCPConnector(
+            limit=self.pool_size * len(self.backends),
+            limit_per_host=self.pool_size,
+            keepalive_timeout=self.keepalive_timeout
+        )
+        timeout = aiohttp.ClientTimeout(
+            total=None,
+            sock_connect=self.connect_timeout,
+            sock_read=self.read_timeout
+        )
+        self.session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+
+    async def close(self):
+        """Close the shared session and its pooled connections"""
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    def _score(self, backend):
+        """Lower is better: in-flight requests, weighted by latency in latency mode"""
+        if self.balance == 'latency':
+            latency = backend.latency if backend.latency is not None else 0.0
+            return ((backend.outstanding + 1) * latency, backend.outstanding)
+        return (backend.outstanding, backend.latency or 0.0)
+
+    def pick_backend(self, route_key=None):
+        """Choose a backend, keeping a route key on the same one while it stays healthy"""
+        if route_key is not None:
+            backend = self.sticky.get(route_key)
+            if backend is not None and backend.healthy:
+                self.sticky.move_to_end(route_key)
+                return backend
+
+        # With every backend ejected, still try rather than fail outright
+        candidates = [backend for backend in self.backends if backend.healthy] or self.backends
+        backend = min(candidates, key=self._score)
+
+        if route_key is not None:
+            # Stick so the backend's prompt cache stays warm for this channel
+            self.sticky[route_key] = backend
+            self.sticky.move_to_end(route_key)
+            while len(self.sticky) > self.max_sticky:
+                self.sticky.popitem(last=False)
+        return backend
+
+    def _payload(self, model=None, **fields):
+        """Build a request payload for a model, the configured one by default"""
+        payload = {"model": model or self.model}
+        payload.update(fields)
+        if self.keep_alive is not None:
+            payload["keep_alive"] = self.keep_alive
+        return payload
+
+    def _eject(self, backend, error):
+        """Take a backend out of rotation until a health check re-admits it"""
+        backend.failures += 1
+        if backend.healthy:
+            backend.healthy = False
+            print(f"⚠️ Ollama backend {backend.url} ejected: {error}")
+
+    async def _wait_for_load(self, backend, model):
+        """Wait out a load of the model already running on the backend"""
+        task = backend.warming.get(model)
+        if task is None:
+            return
+        try:
+            # The load can outlast read_timeout, so don't start the request's clock until it's done
+            await asyncio.shield(task)
+        except Exception:
+            pass
+
+    async def _post(self, path, payload, route_key=None):
+        """POST a JSON payload and return the decoded JSON response"""
+        backend = self.pick_backend(route_key)
+        await self._wait_for_load(backend, payload.get('model'))
+        backend.outstanding += 1
+        backend.requests += 1
+        start = time.monotonic()
+        try:
+            async with self.session.post(f"{backend.url}{path}", json=payload) as response:
+                backend.record_latency(time.monotonic() - start)
+                if response.status != 200:
+                    raise OllamaError(f"Ollama API error: {response.status} - {await response.text()}")
+                return await response.json(content_type=None)
+        except aiohttp.ClientConnectionError as e:
+            self._eject(backend, e)
+            raise
+        finally:
+            backend.outstanding -= 1
+
+    async def _stream(self, path, payload, route_key=None):
+        """POST a JSON payload and yield each NDJSON line of the response"""
+        backend = self.pick_backend(route_key)
+        await self._wait_for_load(backend, payload.get('model'))
+        backend.outstanding += 1
+        backend.requests += 1
+        start = time.monotonic()
+        try:
+            async with self.session.post(f"{backend.url}{path}", json=payload) as response:
+                backend.record_latency(time.monotonic() - start)
+                if response.status != 200:
+                    raise OllamaError(f"Ollama API error: {response.status} - {await response.text()}")
+                async for line in response.content:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    data = json.loads(line)
+                    if 'error' in data:
+                        raise OllamaError(f"Ollama API error: {data['error']}")
+                    yield data
+                    if data.get('done'):
+                        break
+        except aiohttp.ClientConnectionError as e:
+            self._eject(backend, e)
+            raise
+        finally:
+            backend.outstanding -= 1
+
+    async def generate(self, prompt, route_key=None, model=None):
+        """Run a non-streaming generation and return the full response data"""
+        payload = self._payload(model, prompt=prompt, stream=False)
+        return await self._post('/api/generate', payload, route_key)
+
+    async def stream_generate(self, prompt, route_key=None, model=None):
+        """Run a streaming generation, yielding each response chunk"""
+        payload = self._payload(model, prompt=prompt, stream=True)
+        async for data in self._stream('/api/generate', payload, route_key):
+            yield data
+
+    async def chat(self, messages, route_key=None, model=None):
+        """Run a non-streaming chat completion over structured messages"""
+        payload = self._payload(model, messages=messages, stream=False)
+        return await self._post('/api/chat', payload, route_key)
+
+    async def stream_chat(self, messages, route_key=None, model=None):
+        """Run a streaming chat completion, yielding each response chunk"""
+        payload = self._payload(model, messages=messages, stream=True)
+        async for data in self._stream('/api/chat', payload, route_key):
+            yield data
+
+    async def embed(self, text, model, route_key=None):
+        """Get the embedding vector for a piece of text"""
+        payload = {"model": model, "prompt": text}
+        if self.keep_alive is not None:
+            payload["keep_alive"] = self.keep_alive
+        data = await self._post('/api/embeddings', payload, route_key)
+        return data.get('embedding')
+
+    async def load_model(self, backend, model=None):
+        """Load a model into a backend's memory for keep_alive, returns the seconds loading took"""
+        model = model or self.model
+        if model in self.embed_models:
+            path, payload = '/api/embeddings', {"model": model, "prompt": ""}  # Empty prompt: only loads the model
+        else:
+            path, payload = '/api/generate', {"model": model}  # No prompt: Ollama only loads the model
+        if self.keep_alive is not None:
+            payload["keep_alive"] = self.keep_alive
+        request_timeout = aiohttp.ClientTimeout(total=None, sock_connect=self.connect_timeout,
+                                                sock_read=self.load_timeout)
+
+        if backend.model_state.get(model) != 'loaded':
+            backend.model_state[model] = 'loading'
+        start = time.monotonic()
+        try:
+            async with self.session.post(f"{backend.url}{path}", json=payload,
+                                         timeout=request_timeout) as response:
+                if response.status != 200:
+                    raise OllamaError(f"Ollama API error: {response.status} - {await response.text()}")
+                data = await response.json(content_type=None)
+        except Exception:
+            backend.model_state[model] = 'error'
+            raise
+
+        backend.model_state[model] = 'loaded'
+        seconds = data.get('load_duration', 0) / 1e9 or time.monotonic() - start
+        if seconds >= COLD_LOAD_SECONDS:
+            backend.load_seconds[model] = seconds
+        return seconds
+
+    def warm(self, backend, model=None):
+        """Start loading a model on a backend unless that's already running, returns the task"""
+        model = model or self.model
+        task = backend.warming.get(model)
+        if task is None:
+            task = backend.warming[model] = asyncio.ensure_future(self.load_model(backend, model))
+            task.add_done_callback(lambda _: backend.warming.pop(model, None))
+        return task
+
+    async def warm_up(self, model=None):
+        """Load a model on every backend at once, returns (backend, seconds or exception) pairs"""
+        results = await asyncio.gather(*(self.warm(backend, model) for backend in self.backends),
+                                       return_exceptions=True)
+        return list(zip(self.backends, results))
+
+    async def loaded_models(self, backend, timeout=5.0):
+        """Return the names of the models a backend has in memory"""
+        request_timeout = aiohttp.ClientTimeout(total=timeout)
+        async with self.session.get(f"{backend.url}/api/ps", timeout=request_timeout) as response:
+            if response.status != 200:
+                raise OllamaError(f"Ollama API error: {response.status}")
+            data = await response.json(content_type=None)
+        return [model['name'] for model in data.get('models', [])]
+
+    async def refresh_model_state(self, backend, models):
+        """Mark which of the models a backend still has loaded, Ollama unloads idle ones"""
+        loaded = {model_name(name) for name in await self.loaded_models(backend, timeout=self.connect_timeout)}
+        for model in models:
+            if model in backend.warming:
+                continue
+            backend.model_state[model] = 'loaded' if model_name(model) in loaded else 'cold'
+
+    async def list_models(self, backend=None, timeout=5.0):
+        """Return the names of the models available on a backend"""
+        if backend is None:
+            backend = self.pick_backend()
+        request_timeout = aiohttp.ClientTimeout(total=timeout)
+        async with self.session.get(f"{backend.url}/api/tags", timeout=request_timeout) as response:
+            if response.status != 200:
+                raise OllamaError(f"Ollama API error: {response.status}")
+            data = await response.json(content_type=None)
+        return [model['name'] for model in data.get('models', [])]
+
+    async def check_backend(self, backend):
+        """Probe a backend with /api/tags, ejecting or re-admitting it"""
+        try:
+            await self.list_models(backend, timeout=self.connect_timeout)
+        except Exception as e:
+            self._eject(backend, e)
+            return False
+
+        if not backend.healthy:
+            print(f"✅ Ollama backend {backend.url} re-admitted")
+        backend.healthy = True
+        return True
+
+    async def run_health_checks(self, interval):
+        """Periodically probe every backend"""
+        while True:
+            await asyncio.gather(*(self.check_backend(backend) for backend in self.backends))
+            await asyncio.sleep(interval)
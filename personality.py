@@ -0,0 +1,285 @@
+"""
+Personality - Per-guild and per-channel personality profiles with precompiled system prompts
+"""
+import asyncio
+import copy
+import itertools
+import json
+from collections import OrderedDict
+from triggers import TriggerMatcher
+
+# Prompt fragments for each personality trait value
+PERSONALITY_PHRASES = {
+    'formality': {
+        'formal': "Respond in a formal, professional tone.",
+        'casual': "Respond in a casual, conversational tone.",
+        'friendly': "Respond in a warm, friendly tone."
+    },
+    'humor': {
+        'light': "Occasionally use light humor when appropriate.",
+        'moderate': "Use humor moderately to make responses engaging.",
+        'heavy': "Use humor frequently to make responses entertaining."
+    },
+    'helpfulness': {
+        'high': "Be extremely helpful and thorough in your responses.",
+        'medium': "Be helpful and informative in your responses."
+    },
+    'creativity': {
+        'high': "Be creative and think outside the box.",
+        'medium': "Be moderately creative in your responses."
+    }
+}
+
+SAFETY_GUIDELINES = {
+    'strict': ("Never provide harmful, illegal, or inappropriate content. "
+               "Always prioritize safety and ethical considerations. "
+               "Refuse requests that could cause harm."),
+    'moderate': ("Avoid harmful or inappropriate content. "
+                 "Be cautious with sensitive topics and provide balanced perspectives."),
+    'permissive': ("Be helpful while being mindful of content appropriateness.")
+}
+
+
+def default_personality(system_prompt):
+    """Get the default personality settings"""
+    return {
+        'system_prompt': system_prompt,
+        'safety_level': 'moderate',  # strict, moderate, permissive
+        'max_response_length': 2000,
+        'temperature': 0.7,
+        'context_length': 10,  # Number of previous messages to remember
+        'context_enabled': True,  # Whether to use context at all
+        'auto_reply_enabled': True,  # Whether to auto-reply without mentions
+        'auto_reply_trigger_words': [],  # Words that trigger auto-reply
+        'auto_reply_whole_words': False,  # Only match trigger words standing on their own
+        'auto_reply_probability': 1.0,  # Probability of auto-replying (0.0-1.0)
+        'auto_reply_cooldown': 10,  # Seconds between auto-replies in same channel
+        'personality_traits': {
+            'formality': 'casual',  # formal, casual, friendly
+            'humor': 'light',       # none, light, moderate, heavy
+            'helpfulness': 'high',  # low, medium, high
+            'creativity': 'medium'   # low, medium, high
+        }
+    }
+
+
+def neutral_personality():
+    """Get minimal settings for a neutral AI"""
+    settings = default_personality("You are an AI assistant.")
+    settings['personality_traits'] = {
+        'formality': 'casual',
+        'humor': 'none',
+        'helpfulness': 'medium',
+        'creativity': 'low'
+    }
+    return settings
+
+
+def merge_settings(settings, overrides):
+    """Apply overrides on top of settings, merging personality traits key by key"""
+    merged = dict(settings)
+    for key, value in overrides.items():
+        if key == 'personality_traits':
+            merged[key] = {**settings.get(key, {}), **value}
+        else:
+            merged[key] = value
+    return merged
+
+
+def compile_prompt(settings):
+    """Generate the personality-based system prompt for a set of settings"""
+    traits = settings['personality_traits']
+
+    # Add personality traits to prompt
+    personality_additions = []
+    for trait in ('formality', 'humor', 'helpfulness', 'creativity'):
+        phrase = PERSONALITY_PHRASES[trait].get(traits.get(trait))
+        if phrase:
+            personality_additions.append(phrase)
+
+    # Add safety guidelines
+    safety_guidelines = SAFETY_GUIDELINES.get(settings['safety_level'], "")
+
+    full_prompt = f"{settings['system_prompt']}\n\n"
+    if personality_additions:
+        full_prompt += "Personality: " + " ".join(personality_additions) + "\n\n"
+    if safety_guidelines:
+        full_prompt += f"Safety Guidelines: {safety_guidelines}\n\n"
+
+    return full_prompt
+
+
+class Profile:
+    __slots__ = ('settings', 'prompt', 'triggers', 'scope', 'version', 'generation')
+
+    def __init__(self, settings, scope, version, generation):
+        self.settings = settings  # Effective settings after applying every override
+        self.prompt = compile_prompt(settings)
+        self.triggers = TriggerMatcher(settings['auto_reply_trigger_words'], settings.get('auto_reply_whole_words', False))
+        self.scope = scope  # 'global', 'guild' or 'channel', where the closest override lives
+        self.version = version  # Unique per compiled profile, keys cached replies to this prompt
+        self.generation = generation  # Defaults generation this profile was built from
+
+
+class GuildProfiles:
+    __slots__ = ('guild', 'channels', 'resolved')
+
+    def __init__(self, guild=None, channels=None):
+        self.guild = guild  # Guild-wide overrides, None when the guild has none
+        self.channels = channels or {}  # channel_id -> overrides
+        self.resolved = {}  # channel_id, or None for the guild itself -> Profile
+
+
+class PersonalityStore:
+    def __init__(self, defaults, db, state_versions=None, max_guilds=1000):
+        self.db = db  # Shared Database
+        self.state_versions = state_versions  # Announces profile changes to other processes
+        self.max_guilds = max_guilds  # Guilds kept in memory, least recently used are evicted
+        self.guilds = OrderedDict()  # guild_id -> GuildProfiles
+        self.loading = {}  # guild_id -> future for an in-progress load
+        self.versions = itertools.count(1)
+        self.generation = 0  # Bumped when the defaults change, stale profiles recompile on lookup
+        self.set_defaults(defaults)
+        self.init_tables()
+
+    def init_tables(self):
+        """Create the profile table if it doesn't exist"""
+        # channel_id 0 holds the guild-wide profile
+        self.db.execute('''
+            CREATE TABLE IF NOT EXISTS personality_profiles (
+                guild_id INTEGER NOT NULL,
+                channel_id INTEGER NOT NULL DEFAULT 0,
+                settings TEXT NOT NULL,
+                PRIMARY KEY (guild_id, channel_id)
+            )
+        ''')
+
+    def set_defaults(self, settings):
+        """Replace the global settings every profile inherits from"""
+        self.defaults = settings
+        self.generation += 1
+        self.default_profile = Profile(settings, 'global', next(self.versions), self.generation)
+
+    def update_defaults(self, overrides):
+        """Change some of the global settings"""
+        self.set_defaults(merge_settings(self.defaults, overrides))
+
+    def get(self, guild_id, channel_id):
+        """Get the profile for a channel: its own, then its guild's, then the global one"""
+        entry = self.guilds.get(guild_id) if guild_id is not None else None
+        if entry is None:
+            return self.default_profile
+
+        key = channel_id if channel_id in entry.channels else None
+        profile = entry.resolved.get(key)
+        if profile is None or profile.generation != self.generation:
+            profile = entry.resolved[key] = self._resolve(entry, key)
+        return profile
+
+    def _resolve(self, entry, channel_id):
+        """Merge a guild's overrides onto the defaults and compile the prompt and triggers"""
+        if entry.guild is None and channel_id is None:
+            return self.default_profile
+        settings, scope = self.defaults, 'guild'
+        if entry.guild is not None:
+            settings = merge_settings(settings, entry.guild)
+        if channel_id is not None:
+            settings, scope = merge_settings(settings, entry.channels[channel_id]), 'channel'
+        return Profile(settings, scope, next(self.versions), self.generation)
+
+    def overrides(self, guild_id, channel_id=None):
+        """Get the overrides stored for a guild or channel, None if there are none"""
+        entry = self.guilds.get(guild_id)
+        if entry is None:
+            return None
+        return entry.channels.get(channel_id) if channel_id is not None else entry.guild
+
+    async def ensure_loaded(self, guild_id):
+        """Load a guild's profiles from the database on first use, falling back to the defaults on errors"""
+        try:
+            await self.load(guild_id)
+        except Exception as e:
+            print(f"Error loading personality for guild {guild_id}: {e}")
+
+    async def load(self, guild_id):
+        """Load a guild's profiles from the database on first use, raising if the load fails"""
+        if guild_id in self.guilds:
+            self.guilds.move_to_end(guild_id)
+            return
+
+        future = self.loading.get(guild_id)
+        if future is None:
+            future = self.loading[guild_id] = asyncio.ensure_future(self._load(guild_id))
+            future.add_done_callback(lambda _: self.loading.pop(guild_id, None))
+        await asyncio.shield(future)
+
+    async def _load(self, guild_id):
+        """Read a guild's profiles off the event loop"""
+        rows = await self.db.run(self.read_guild, guild_id)
+
+        # A profile written while we were reading means the guild is already live
+        if guild_id in self.guilds:
+            return
+        entry = GuildProfiles()
+        for channel_id, overrides in rows:
+            if channel_id:
+                entry.channels[channel_id] = overrides
+            else:
+                entry.guild = overrides
+        self.guilds[guild_id] = entry
+        self._evict()
+
+    def read_guild(self, guild_id):
+        """Read every profile stored for a guild (blocking)"""
+        rows = self.db.query('SELECT channel_id, settings FROM personality_profiles WHERE guild_id = ?', (guild_id,))
+        return [(channel_id, json.loads(settings)) for channel_id, settings in rows]
+
+    def _evict(self):
+        """Drop least recently used guilds beyond max_guilds from memory"""
+        while len(self.guilds) > self.max_guilds:
+            self.guilds.popitem(last=False)
+
+    async def update(self, guild_id, channel_id, overrides):
+        """Change some settings for a guild, or for one channel when channel_id is set"""
+        # Merging onto overrides that failed to load would overwrite the stored ones
+        await self.load(guild_id)
+        current = self.overrides(guild_id, channel_id) or {}
+        await self.save(guild_id, channel_id, merge_settings(current, overrides))
+
+    async def save(self, guild_id, channel_id, overrides):
+        """Replace the overrides for a guild or channel, None removes them"""
+        await self.db.run(self.write_profile, guild_id, channel_id or 0, copy.deepcopy(overrides))
+
+        # Write-through, the entry is created if the guild was evicted meanwhile
+        entry = self.guilds.get(guild_id)
+        if entry is None:
+            await self.ensure_loaded(guild_id)
+            return
+        if channel_id is None:
+            entry.guild = overrides
+        elif overrides is None:
+            entry.channels.pop(channel_id, None)
+        else:
+            entry.channels[channel_id] = overrides
+        entry.resolved.clear()
+
+    def write_profile(self, guild_id, channel_id, overrides):
+        """Store or delete a profile row (blocking, run on the database writer thread)"""
+        if overrides is None:
+            self.db.execute('DELETE FROM personality_profiles WHERE guild_id = ? AND channel_id = ?',
+                            (guild_id, channel_id))
+        else:
+            self.db.execute('''
+                INSERT OR REPLACE INTO personality_profiles (guild_id, channel_id, settings)
+                VALUES (?, ?, ?)
+            ''', (guild_id, channel_id, json.dumps(overrides)))
+        if self.state_versions is not None:
+            self.state_versions.bump('personality_profiles')
+
+    def invalidate(self):
+        """Forget every cached guild, they reload on next use"""
+        self.guilds.clear()
+
+    def stats(self):
+        """Get (guilds in memory, compiled profiles in memory)"""
+        return len(self.guilds), sum(len(entry.resolved) for entry in self.guilds.values())
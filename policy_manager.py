@@ -2,22 +2,20 @@
 """
 Policy Manager - Read and edit bot policies directly
 """
-import sqlite3
 import json
 from datetime import datetime
+from database import Database
+from shared_state import StateVersions
 
 class PolicyManager:
     def __init__(self, db_path="bot_policies.db"):
         self.db_path = db_path
+        self.db = Database(db_path)
+        self.state_versions = StateVersions(self.db)  # Tells running bots to reload policies
     
     def get_all_policies(self):
         """Get all server policies"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('SELECT * FROM server_policies')
-        results = cursor.fetchall()
-        conn.close()
+        results = self.db.query('SELECT * FROM server_policies')
         
         policies = []
         for row in results:
@@ -32,19 +30,16 @@ class PolicyManager:
                 'max_message_length': row[7],
                 'require_mention': bool(row[8]),
                 'admin_only': bool(row[9]),
-                'created_at': row[10]
+                'created_at': row[10],
+                'response_cache': bool(row[11]) if len(row) > 11 else False,
+                'model_route': row[12] if len(row) > 12 and row[12] else 'auto'
             })
         
         return policies
     
     def get_server_policy(self, guild_id):
         """Get policy for specific server"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('SELECT * FROM server_policies WHERE guild_id = ?', (guild_id,))
-        result = cursor.fetchone()
-        conn.close()
+        result = self.db.query_one('SELECT * FROM server_policies WHERE guild_id = ?', (guild_id,))
         
         if result:
             return {
@@ -58,74 +53,69 @@ class PolicyManager:
                 'max_message_length': result[7],
                 'require_mention': bool(result[8]),
                 'admin_only': bool(result[9]),
-                'created_at': result[10]
+                'created_at': result[10],
+                'response_cache': bool(result[11]) if len(result) > 11 else False,
+                'model_route': result[12] if len(result) > 12 and result[12] else 'auto'
             }
         return None
     
     def update_server_policy(self, guild_id, **kwargs):
         """Update server policy"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Get existing policy
-        cursor.execute('SELECT * FROM server_policies WHERE guild_id = ?', (guild_id,))
-        existing = cursor.fetchone()
-        
-        if existing:
-            # Update existing
-            cursor.execute('''
-                UPDATE server_policies SET 
-                enabled = ?, allowed_channels = ?, blocked_channels = ?, 
-                allowed_roles = ?, blocked_roles = ?, cooldown_seconds = ?, 
-                max_message_length = ?, require_mention = ?, admin_only = ?
-                WHERE guild_id = ?
-            ''', (
-                kwargs.get('enabled', existing[1]),
-                ','.join(kwargs.get('allowed_channels', [])),
-                ','.join(kwargs.get('blocked_channels', [])),
-                ','.join(kwargs.get('allowed_roles', [])),
-                ','.join(kwargs.get('blocked_roles', [])),
-                kwargs.get('cooldown_seconds', existing[6]),
-                kwargs.get('max_message_length', existing[7]),
-                kwargs.get('require_mention', existing[8]),
-                kwargs.get('admin_only', existing[9]),
-                guild_id
-            ))
-        else:
-            # Insert new
-            cursor.execute('''
-                INSERT INTO server_policies 
-                (guild_id, enabled, allowed_channels, blocked_channels, 
-                 allowed_roles, blocked_roles, cooldown_seconds, 
-                 max_message_length, require_mention, admin_only)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                guild_id,
-                kwargs.get('enabled', True),
-                ','.join(kwargs.get('allowed_channels', [])),
-                ','.join(kwargs.get('blocked_channels', [])),
-                ','.join(kwargs.get('allowed_roles', [])),
-                ','.join(kwargs.get('blocked_roles', [])),
-                kwargs.get('cooldown_seconds', 5),
-                kwargs.get('max_message_length', 2000),
-                kwargs.get('require_mention', False),
-                kwargs.get('admin_only', False)
-            ))
-        
-        conn.commit()
-        conn.close()
+        with self.db.transaction(immediate=True):
+            # Get existing policy
+            existing = self.db.query_one('SELECT * FROM server_policies WHERE guild_id = ?', (guild_id,))
+            
+            if existing:
+                # Update existing
+                self.db.execute('''
+                    UPDATE server_policies SET 
+                    enabled = ?, allowed_channels = ?, blocked_channels = ?, 
+                    allowed_roles = ?, blocked_roles = ?, cooldown_seconds = ?, 
+                    max_message_length = ?, require_mention = ?, admin_only = ?
+                    WHERE guild_id = ?
+                ''', (
+                    kwargs.get('enabled', existing[1]),
+                    ','.join(kwargs.get('allowed_channels', [])),
+                    ','.join(kwargs.get('blocked_channels', [])),
+                    ','.join(kwargs.get('allowed_roles', [])),
+                    ','.join(kwargs.get('blocked_roles', [])),
+                    kwargs.get('cooldown_seconds', existing[6]),
+                    kwargs.get('max_message_length', existing[7]),
+                    kwargs.get('require_mention', existing[8]),
+                    kwargs.get('admin_only', existing[9]),
+                    guild_id
+                ))
+            else:
+                # Insert new
+                self.db.execute('''
+                    INSERT INTO server_policies 
+                    (guild_id, enabled, allowed_channels, blocked_channels, 
+                     allowed_roles, blocked_roles, cooldown_seconds, 
+                     max_message_length, require_mention, admin_only)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', (
+                    guild_id,
+                    kwargs.get('enabled', True),
+                    ','.join(kwargs.get('allowed_channels', [])),
+                    ','.join(kwargs.get('blocked_channels', [])),
+                    ','.join(kwargs.get('allowed_roles', [])),
+                    ','.join(kwargs.get('blocked_roles', [])),
+                    kwargs.get('cooldown_seconds', 5),
+                    kwargs.get('max_message_length', 2000),
+                    kwargs.get('require_mention', False),
+                    kwargs.get('admin_only', False)
+                ))
+        
+        self.state_versions.bump('policies')
         print(f"✅ Updated policy for server {guild_id}")
     
     def delete_server_policy(self, guild_id):
         """Delete server policy"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('DELETE FROM server_policies WHERE guild_id = ?', (guild_id,))
-        cursor.execute('DELETE FROM user_cooldowns WHERE guild_id = ?', (guild_id,))
+        with self.db.transaction():
+            self.db.execute('DELETE FROM server_policies WHERE guild_id = ?', (guild_id,))
+            self.db.execute('DELETE FROM user_cooldowns WHERE guild_id = ?', (guild_id,))
         
-        conn.commit()
-        conn.close()
+        self.state_versions.bump('policies')
         print(f"✅ Deleted policy for server {guild_id}")
     
     def export_policies(self, filename="policies_backup.json"):
@@ -0,0 +1,77 @@
+"""
+Response Cache - TTL and LRU bounded cache for repeated prompts
+"""
+import hashlib
+import time
+from collections import OrderedDict
+
+
+def normalize_message(text):
+    """Lowercase and collapse whitespace so trivial variations share a key"""
+    return " ".join(text.lower().split())
+
+
+class ResponseCache:
+    def __init__(self, max_size=1000, ttl=600):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries = OrderedDict()  # key -> (expires_at, response), least recently used first
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    @staticmethod
+    def make_key(scope, message):
+        """Hash the cache scope (model, prompt version, context) and normalized message"""
+        digest = hashlib.sha256()
+        digest.update(scope.encode('utf-8'))
+        digest.update(b'\0')
+        digest.update(normalize_message(message).encode('utf-8'))
+        return digest.hexdigest()
+
+    def get(self, key):
+        """Get a cached response, or None on a miss"""
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        if entry[0] <= time.monotonic():
+            del self.entries[key]
+            self.expirations += 1
+            self.misses += 1
+            return None
+
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key, response):
+        """Cache a response, evicting the least recently used entries when full"""
+        self.entries[key] = (time.monotonic() + self.ttl, response)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        """Drop every cached response"""
+        self.entries.clear()
+
+    def stats(self):
+        """Get cache counters for tuning"""
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self.entries),
+            'max_size': self.max_size,
+            'ttl': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
@@ -0,0 +1,109 @@
+"""
+Model Router - Chooses between the main model and a fast small model per generation
+"""
+import time
+
+ROUTES = ('auto', 'fast', 'main')  # Per-guild model_route policy values
+
+
+class ModelStats:
+    __slots__ = ('latency', 'requests', 'failures', 'disabled_until', 'sampled_at')
+
+    def __init__(self):
+        self.latency = None  # Moving average of seconds per generation
+        self.requests = 0
+        self.failures = 0
+        self.disabled_until = 0.0  # Monotonic time a failing model is skipped until
+        self.sampled_at = 0.0  # Monotonic time of the last sample, or of the last probe sent for one
+
+    def record(self, seconds, weight):
+        """Fold a finished generation into the moving average latency"""
+        self.requests += 1
+        self.sampled_at = time.monotonic()
+        if self.latency is None:
+            self.latency = seconds
+        else:
+            self.latency += weight * (seconds - self.latency)
+
+
+class ModelRouter:
+    def __init__(self, main_model, fast_model=None, short_message=200, max_context_tokens=512,
+                 queue_threshold=4, latency_target=0.0, failure_backoff=60.0, probe_interval=30.0, weight=0.2):
+        self.main_model = main_model
+        self.fast_model = fast_model or None  # None routes everything to the main model
+        self.short_message = short_message  # Messages up to this many characters may go fast
+        self.max_context_tokens = max_context_tokens  # Longer histories need the main model
+        self.queue_threshold = queue_threshold  # Waiting generations that count as overload, 0 disables
+        self.latency_target = latency_target  # Main model average seconds that count as overload, 0 disables
+        self.failure_backoff = failure_backoff  # Seconds a failing fast model is skipped
+        self.probe_interval = probe_interval  # Seconds before a model routed around gets one request to refresh its stats
+        self.weight = weight
+        self.models = tuple(model for model in (main_model, self.fast_model) if model)
+        self.stats = {model: ModelStats() for model in self.models}
+
+    def choose(self, route, message_length, context_tokens, queue_depth):
+        """Pick the model for a generation, returns (model, reason)"""
+        fast = self.fast_model
+        if fast is None:
+            return self.main_model, 'single'
+        if time.monotonic() < self.stats[fast].disabled_until:
+            return self.main_model, 'fast_failing'
+        if route == 'main':
+            return self.main_model, 'guild'
+        if route == 'fast':
+            return fast, 'guild'
+
+        # Under load every request downgrades, a quick short reply beats a long wait
+        if self.queue_threshold and queue_depth >= self.queue_threshold:
+            return fast, 'queue'
+        main_latency = self.stats[self.main_model].latency
+        if self.latency_target and main_latency is not None and main_latency > self.latency_target:
+            # Without an occasional request the main model's average could never recover
+            if self._probe(self.main_model):
+                return self.main_model, 'probe'
+            return fast, 'latency'
+
+        if message_length <= self.short_message and context_tokens <= self.max_context_tokens:
+            # Only worth it while the fast model really is faster
+            fast_latency = self.stats[fast].latency
+            if fast_latency is None or main_latency is None or fast_latency < main_latency:
+                return fast, 'short'
+            if self._probe(fast):
+                return fast, 'probe'
+        return self.main_model, 'default'
+
+    def _probe(self, model):
+        """Check if a model's stats are stale, claiming the probe so only one request takes it"""
+        stats = self.stats[model]
+        now = time.monotonic()
+        if now - stats.sampled_at < self.probe_interval:
+            return False
+        stats.sampled_at = now
+        return True
+
+    def record(self, model, seconds):
+        """Record a successful generation's duration"""
+        stats = self.stats.get(model)
+        if stats is not None:
+            stats.record(seconds, self.weight)
+
+    def record_failure(self, model):
+        """Record a failed generation, backing off from a failing fast model"""
+        stats = self.stats.get(model)
+        if stats is None:
+            return
+        stats.failures += 1
+        if model == self.fast_model:
+            stats.disabled_until = time.monotonic() + self.failure_backoff
+
+    def status(self):
+        """Get a summary of each model for status displays"""
+        now = time.monotonic()
+        return [{
+            'model': model,
+            'role': 'fast' if model == self.fast_model else 'main',
+            'latency_ms': stats.latency * 1000 if stats.latency is not None else None,
+            'requests': stats.requests,
+            'failures': stats.failures,
+            'available': now >= stats.disabled_until
+        } for model, stats in self.stats.items()]
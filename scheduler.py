@@ -0,0 +1,104 @@
+"""
+Generation Scheduler - Bounded, per-guild fair queue in front of Ollama
+"""
+import asyncio
+import contextvars
+from collections import OrderedDict, deque
+
+
+class QueueFull(Exception):
+    """Raised when the generation queue has no room for another job"""
+
+
+class Slot:
+    __slots__ = ('held',)
+
+    def __init__(self):
+        self.held = True  # False once the job gave its slot back early
+
+
+# The slot of the job running in the current task, None outside scheduled jobs
+current_slot = contextvars.ContextVar('current_slot', default=None)
+
+
+class GenerationScheduler:
+    def __init__(self, concurrency=4, max_queue=50):
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        # guild key -> OrderedDict(channel key -> deque of (job_factory, future, context)).
+        # Both levels are rotated on every pick, giving round-robin across
+        # guilds and, within a guild, across channels.
+        self.queues = OrderedDict()
+        self.depth = 0
+        self.in_flight = 0
+
+    def submit(self, guild_id, channel_id, job_factory):
+        """Queue a job and return a future for its result, raises QueueFull when full"""
+        if self.in_flight >= self.concurrency and self.depth >= self.max_queue:
+            raise QueueFull()
+
+        future = asyncio.get_event_loop().create_future()
+        guild_key = guild_id if guild_id is not None else ('dm', channel_id)
+        channels = self.queues.setdefault(guild_key, OrderedDict())
+        # Jobs run in the submitter's context, so tracing spans nest under its message
+        channels.setdefault(channel_id, deque()).append((job_factory, future, contextvars.copy_context()))
+        self.depth += 1
+
+        self._dispatch()
+        return future
+
+    def _next_job(self):
+        """Pop the next job in round-robin order"""
+        guild_key, channels = next(iter(self.queues.items()))
+        self.queues.move_to_end(guild_key)
+        channel_key, jobs = next(iter(channels.items()))
+        channels.move_to_end(channel_key)
+
+        job = jobs.popleft()
+        if not jobs:
+            del channels[channel_key]
+            if not channels:
+                del self.queues[guild_key]
+        self.depth -= 1
+        return job
+
+    def _dispatch(self):
+        """Start queued jobs while there are free generation slots"""
+        while self.in_flight < self.concurrency and self.depth:
+            job_factory, future, context = self._next_job()
+            if future.done():
+                # Waiter gave up while queued
+                continue
+
+            self.in_flight += 1
+            slot = Slot()
+            task = context.run(self._start, job_factory, slot)
+            task.add_done_callback(lambda task, future=future, slot=slot: self._finish(task, future, slot))
+            future.add_done_callback(lambda future, task=task: task.cancel() if future.cancelled() else None)
+
+    def _start(self, job_factory, slot):
+        """Start a job's task with its slot visible to release()"""
+        current_slot.set(slot)
+        return asyncio.ensure_future(job_factory())
+
+    def release(self):
+        """Give the running job's slot to the next queued job, for jobs that only wait on another's result"""
+        slot = current_slot.get()
+        if slot is None or not slot.held:
+            return
+        slot.held = False
+        self.in_flight -= 1
+        self._dispatch()
+
+    def _finish(self, task, future, slot):
+        """Hand a finished job's outcome to its waiter and start the next job"""
+        if slot.held:
+            self.in_flight -= 1
+        if not future.done():
+            if task.cancelled():
+                future.cancel()
+            elif task.exception() is not None:
+                future.set_exception(task.exception())
+            else:
+                future.set_result(task.result())
+        self._dispatch()
@@ -0,0 +1,112 @@
+"""
+Semantic Cache - Near-duplicate prompt cache over Ollama embeddings
+"""
+import hashlib
+import time
+import numpy as np
+
+
+def scope_id(scope):
+    """Hash a cache scope string into a 64-bit integer for vectorized masking"""
+    digest = hashlib.blake2b(scope.encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'little', signed=True)
+
+
+class SemanticCache:
+    def __init__(self, max_size=2000, threshold=0.92, ttl=600):
+        self.max_size = max_size
+        self.threshold = threshold  # Minimum cosine similarity for a hit
+        self.ttl = ttl  # Seconds an entry stays valid, like the exact tier
+        self.vectors = None  # (max_size, dim) float32 unit vectors, allocated on first put
+        self.scopes = np.zeros(max_size, dtype=np.int64)
+        self.last_used = np.zeros(max_size, dtype=np.float64)
+        self.expires_at = np.zeros(max_size, dtype=np.float64)
+        self.responses = [None] * max_size
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return self.size
+
+    @staticmethod
+    def _normalize(embedding):
+        """Convert an embedding to a float32 unit vector, or None if it's empty"""
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        if vector.ndim != 1 or norm == 0:
+            return None
+        return vector / norm
+
+    def lookup(self, scope, embedding):
+        """Get (response, similarity) for the nearest cached prompt in scope, or None"""
+        vector = self._normalize(embedding)
+        if self.size == 0 or vector is None or vector.shape[0] != self.vectors.shape[1]:
+            self.misses += 1
+            return None
+
+        # Cosine similarity against every entry at once; other scopes and expired entries can't match
+        now = time.monotonic()
+        similarities = self.vectors[:self.size] @ vector
+        similarities[self.scopes[:self.size] != scope_id(scope)] = -1.0
+        similarities[self.expires_at[:self.size] <= now] = -1.0
+        index = int(np.argmax(similarities))
+        similarity = float(similarities[index])
+
+        if similarity < self.threshold:
+            self.misses += 1
+            return None
+
+        self.last_used[index] = now
+        self.hits += 1
+        return self.responses[index], similarity
+
+    def put(self, scope, embedding, response):
+        """Cache a response, replacing the least recently used entry when full"""
+        vector = self._normalize(embedding)
+        if vector is None:
+            return
+
+        if self.vectors is None or self.vectors.shape[1] != vector.shape[0]:
+            # First entry, or the embedding model changed dimensions
+            self.vectors = np.zeros((self.max_size, vector.shape[0]), dtype=np.float32)
+            self.size = 0
+
+        now = time.monotonic()
+        if self.size < self.max_size:
+            index = self.size
+            self.size += 1
+        else:
+            # Reuse an expired entry before evicting a live one
+            expired = np.flatnonzero(self.expires_at <= now)
+            if expired.size:
+                index = int(expired[0])
+            else:
+                index = int(np.argmin(self.last_used))
+                self.evictions += 1
+
+        self.vectors[index] = vector
+        self.scopes[index] = scope_id(scope)
+        self.last_used[index] = now
+        self.expires_at[index] = now + self.ttl
+        self.responses[index] = response
+
+    def clear(self):
+        """Drop every cached entry"""
+        self.size = 0
+        self.responses = [None] * self.max_size
+
+    def stats(self):
+        """Get cache counters for tuning"""
+        lookups = self.hits + self.misses
+        return {
+            'size': self.size,
+            'max_size': self.max_size,
+            'threshold': self.threshold,
+            'ttl': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
@@ -0,0 +1,73 @@
+"""
+Shared State - Change notification and settings shared between bot processes
+"""
+import json
+
+
+def shard_for_guild(guild_id, shard_count):
+    """Get the shard Discord assigns a guild to"""
+    return (guild_id >> 22) % shard_count
+
+
+class StateVersions:
+    def __init__(self, db):
+        self.db = db  # Shared Database
+        self.seen = {}  # name -> last version this process has applied
+        self.init_tables()
+
+        # Record current versions; state loaded after this point is up to date
+        self.changed()
+
+    def init_tables(self):
+        """Create the version and settings tables if they don't exist"""
+        with self.db.transaction():
+            self.db.execute('''
+                CREATE TABLE IF NOT EXISTS state_versions (
+                    name TEXT PRIMARY KEY,
+                    version INTEGER NOT NULL DEFAULT 0
+                )
+            ''')
+            self.db.execute('''
+                CREATE TABLE IF NOT EXISTS bot_settings (
+                    key TEXT PRIMARY KEY,
+                    value TEXT
+                )
+            ''')
+
+    def bump(self, name):
+        """Announce that shared state changed, other processes pick it up on poll"""
+        with self.db.transaction(immediate=True):
+            row = self.db.query_one('SELECT version FROM state_versions WHERE name = ?', (name,))
+            current = row[0] if row else None
+            self.db.execute('''
+                INSERT INTO state_versions (name, version) VALUES (?, 1)
+                ON CONFLICT(name) DO UPDATE SET version = version + 1
+            ''', (name,))
+            # Only skip our own bump; if another process bumped since our last poll, stay stale so it reloads
+            if self.seen.get(name) == current:
+                self.seen[name] = (current or 0) + 1
+
+    def changed(self):
+        """Get the names bumped by other processes since the last poll"""
+        changed = []
+        for name, version in self.db.query('SELECT name, version FROM state_versions'):
+            if self.seen.get(name) != version:
+                changed.append(name)
+                self.seen[name] = version
+        return changed
+
+    def get_setting(self, key, default=None):
+        """Read a JSON setting shared between processes"""
+        result = self.db.query_one('SELECT value FROM bot_settings WHERE key = ?', (key,))
+        return json.loads(result[0]) if result else default
+
+    def set_setting(self, key, value):
+        """Write a JSON setting shared between processes"""
+        self.db.execute('''
+            INSERT OR REPLACE INTO bot_settings (key, value) VALUES (?, ?)
+        ''', (key, json.dumps(value)))
+
+    def publish_setting(self, key, value):
+        """Write a shared setting and announce the change under the same name"""
+        self.set_setting(key, value)
+        self.bump(key)
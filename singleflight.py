@@ -0,0 +1,52 @@
+"""
+Single Flight - Share one in-flight call between concurrent identical requests
+"""
+import asyncio
+import hashlib
+import json
+
+
+def request_key(model, prompt):
+    """Hash the model and prompt (a string or a list of chat messages)"""
+    encoded = json.dumps([model, prompt], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+class SingleFlight:
+    def __init__(self):
+        self.calls = {}  # key -> future of the call in flight
+        self.started = 0
+        self.shared = 0  # Callers that waited on another caller's call
+
+    def __len__(self):
+        return len(self.calls)
+
+    def __contains__(self, key):
+        return key in self.calls
+
+    async def do(self, key, call):
+        """Await call() once per key at a time, concurrent callers get the same result"""
+        future = self.calls.get(key)
+        if future is None:
+            future = asyncio.ensure_future(call())
+            self.calls[key] = future
+            future.add_done_callback(lambda done: self._forget(key, done))
+            self.started += 1
+        else:
+            self.shared += 1
+
+        # One waiter being cancelled must not cancel the call for the others
+        return await asyncio.shield(future)
+
+    def _forget(self, key, future):
+        """Drop a finished call so the next request starts a fresh one"""
+        if self.calls.get(key) is future:
+            del self.calls[key]
+
+    def stats(self):
+        """Get counters for tuning"""
+        return {
+            'in_flight': len(self.calls),
+            'started': self.started,
+            'shared': self.shared
+        }
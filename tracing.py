@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Tracing - Per-message span trees written to a JSONL file for offline analysis
+"""
+import contextvars
+import json
+import random
+import sys
+import time
+from contextlib import contextmanager
+
+# Marks a trace that lost the sampling roll, so its children are skipped too
+NOT_SAMPLED = object()
+
+current_span = contextvars.ContextVar('current_span', default=None)
+
+
+def new_id():
+    """Get a random 64-bit hex id"""
+    return f"{random.getrandbits(64):016x}"
+
+
+class Span:
+    __slots__ = ('trace_id', 'span_id', 'parent_id', 'name', 'start', 'duration', 'attributes')
+
+    def __init__(self, name, parent=None, attributes=None):
+        self.trace_id = parent.trace_id if parent is not None else new_id()
+        self.span_id = new_id()
+        self.parent_id = parent.span_id if parent is not None else None
+        self.name = name
+        self.start = time.time()
+        self.duration = None
+        self.attributes = attributes or {}
+
+    def set(self, **attributes):
+        """Attach attributes to the span"""
+        self.attributes.update(attributes)
+
+    def to_dict(self):
+        return {
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'name': self.name,
+            'start': self.start,
+            'duration_ms': self.duration * 1000,
+            'attributes': self.attributes
+        }
+
+
+class Tracer:
+    def __init__(self):
+        self.path = None  # JSONL output file, None disables tracing
+        self.sample_rate = 1.0  # Fraction of root spans (messages) traced
+        self.pending = []  # Finished spans waiting to be written
+
+    def configure(self, path, sample_rate=1.0):
+        """Enable tracing to a file, an empty path disables it"""
+        self.path = path or None
+        self.sample_rate = sample_rate
+
+    @contextmanager
+    def span(self, name, **attributes):
+        """Time a block as a child of the current span, yields the span or None"""
+        parent = current_span.get()
+        if self.path is None or parent is NOT_SAMPLED:
+            yield None
+            return
+
+        if parent is None and random.random() >= self.sample_rate:
+            token = current_span.set(NOT_SAMPLED)
+            try:
+                yield None
+            finally:
+                current_span.reset(token)
+            return
+
+        span = Span(name, parent, attributes)
+        token = current_span.set(span)
+        start = time.perf_counter()
+        try:
+            yield span
+        except BaseException as e:
+            span.attributes['error'] = repr(e)
+            raise
+        finally:
+            span.duration = time.perf_counter() - start
+            current_span.reset(token)
+            self.pending.append(span.to_dict())
+
+    def annotate(self, **attributes):
+        """Attach attributes to the current span, if it is traced"""
+        span = current_span.get()
+        if span is not None and span is not NOT_SAMPLED:
+            span.attributes.update(attributes)
+
+    def take_pending(self):
+        """Snapshot finished spans and reset the batch"""
+        pending = self.pending
+        self.pending = []
+        return pending
+
+    def write_pending(self, spans):
+        """Append spans to the trace file (blocking, run off the event loop)"""
+        if not spans or self.path is None:
+            return
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.writelines(json.dumps(span) + "\n" for span in spans)
+
+    def flush(self):
+        """Write all finished spans synchronously"""
+        self.write_pending(self.take_pending())
+
+
+def ollama_timings(data):
+    """Get Ollama's own timing fields from a response, in milliseconds"""
+    timings = {}
+    for field in ('load_duration', 'prompt_eval_duration', 'eval_duration', 'total_duration'):
+        if field in data:
+            timings[field.replace('_duration', '_ms')] = data[field] / 1e6
+    for field in ('prompt_eval_count', 'eval_count'):
+        if field in data:
+            timings[field] = data[field]
+    return timings
+
+
+# Process-wide tracer, enabled by the bot when TRACE_FILE is set
+tracer = Tracer()
+span = tracer.span
+annotate = tracer.annotate
+
+
+def summarize(path):
+    """Print count and latency percentiles per span name from a trace file"""
+    durations = {}
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            record = json.loads(line)
+            durations.setdefault(record['name'], []).append(record['duration_ms'])
+
+    print(f"{'span':<24} {'count':>8} {'avg ms':>10} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10}")
+    for name, values in sorted(durations.items(), key=lambda item: -sum(item[1])):
+        values.sort()
+        pick = lambda q: values[min(int(q * len(values)), len(values) - 1)]
+        print(f"{name:<24} {len(values):>8} {sum(values)/len(values):>10.2f} "
+              f"{pick(0.5):>10.2f} {pick(0.95):>10.2f} {pick(0.99):>10.2f}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("Usage: python tracing.py <trace file>")
+        sys.exit(1)
+    summarize(sys.argv[1])
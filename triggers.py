@@ -0,0 +1,74 @@
+"""
+Triggers - Auto-reply trigger words compiled once into a substring set or a trie-shaped regex
+"""
+import re
+
+END = ''  # Trie key marking the end of a trigger
+
+# Up to this many triggers, one C substring search per trigger beats the regex scan
+LOOP_LIMIT = 32
+
+
+def build_trie(words):
+    """Build a character trie of the words"""
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[END] = {}
+    return trie
+
+
+def trie_pattern(node, prune_suffixes):
+    """Render a trie as a regex that shares each common prefix, None for a bare end"""
+    ends_here = END in node
+    if ends_here and (prune_suffixes or len(node) == 1):
+        # Anywhere matching is satisfied by the shorter trigger, so longer ones are dead
+        return None
+
+    alternatives = []
+    single_chars = []
+    for char in sorted(key for key in node if key != END):
+        child = trie_pattern(node[char], prune_suffixes)
+        if child is None:
+            single_chars.append(re.escape(char))
+        else:
+            alternatives.append(re.escape(char) + child)
+    if single_chars:
+        alternatives.append(single_chars[0] if len(single_chars) == 1 else "[" + "".join(single_chars) + "]")
+
+    pattern = alternatives[0] if len(alternatives) == 1 else "(?:" + "|".join(alternatives) + ")"
+    if ends_here:
+        pattern = f"(?:{pattern})?"
+    return pattern
+
+
+class TriggerMatcher:
+    __slots__ = ('words', 'whole_words', 'literals', 'regex')
+
+    def __init__(self, words, whole_words=False):
+        self.words = tuple(sorted({word.lower().strip() for word in words} - {''}))
+        self.whole_words = whole_words  # Only match triggers that aren't part of a longer word
+        self.literals = None  # Lowercased triggers searched one by one, for small sets
+        self.regex = None
+        if self.words and not whole_words and len(self.words) <= LOOP_LIMIT:
+            # A trigger containing a shorter trigger is redundant, the shorter one matches too
+            self.literals = tuple(word for word in self.words
+                                  if not any(other != word and other in word for other in self.words))
+        elif self.words:
+            pattern = trie_pattern(build_trie(self.words), prune_suffixes=not whole_words)
+            if whole_words:
+                # Lookarounds instead of \b, so triggers like "c++" still match
+                pattern = rf"(?<!\w)(?:{pattern})(?!\w)"
+            self.regex = re.compile(pattern)
+
+    def __bool__(self):
+        return bool(self.words)
+
+    def search(self, text):
+        """Check if the text contains any trigger, ignoring case"""
+        if self.literals is not None:
+            text = text.lower()
+            return any(word in text for word in self.literals)
+        return self.regex is not None and self.regex.search(text.lower()) is not None
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Generation Worker - Runs Ollama calls handed out by the bot's worker broker
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import aiohttp
+from config import *
+from ollama_client import OllamaClient, OllamaError
+from worker_pool import parse_address, broker_addresses, send_line
+
+
+class GenerationWorker:
+    def __init__(self, addresses, slots, name=None):
+        self.brokers = [parse_address(address) for address in addresses]  # (host, port) of every bot process
+        self.slots = slots
+        self.name = name or f"{socket.gethostname()}:{os.getpid()}"
+        self.semaphore = asyncio.Semaphore(slots)  # Shared by every broker, so Ollama never sees more than slots
+        self.ollama = OllamaClient(
+            OLLAMA_BASE_URLS,
+            OLLAMA_MODEL,
+            pool_size=OLLAMA_POOL_SIZE,
+            connect_timeout=OLLAMA_CONNECT_TIMEOUT,
+            read_timeout=OLLAMA_READ_TIMEOUT,
+            keepalive_timeout=OLLAMA_KEEPALIVE_TIMEOUT,
+            keep_alive=OLLAMA_KEEP_ALIVE or None,
+            balance=OLLAMA_BALANCE
+        )
+
+    async def run_job(self, writer, job, jobs):
+        """Run one job against Ollama and send its chunks and result back"""
+        job_id = job['id']
+        method = getattr(self.ollama, job['method'])
+        try:
+            async with self.semaphore:
+                if job['method'].startswith('stream_'):
+                    async for data in method(job['payload'], job.get('route_key'), job.get('model')):
+                        await send_line(writer, {'type': 'chunk', 'id': job_id, 'data': data})
+                    await send_line(writer, {'type': 'result', 'id': job_id, 'data': None})
+                else:
+                    data = await method(job['payload'], job.get('route_key'), job.get('model'))
+                    await send_line(writer, {'type': 'result', 'id': job_id, 'data': data})
+        except asyncio.CancelledError:
+            raise
+        except ConnectionError:
+            # The broker went away, the reconnect loop takes over
+            pass
+        except (OllamaError, aiohttp.ClientError, asyncio.TimeoutError) as e:
+            await send_line(writer, {'type': 'error', 'id': job_id, 'error': str(e) or repr(e)})
+        except Exception as e:
+            print(f"Unexpected error in job {job_id}: {e}")
+            await send_line(writer, {'type': 'error', 'id': job_id, 'error': f"Worker error: {e}"})
+        finally:
+            jobs.pop(job_id, None)
+
+    async def serve(self, reader, writer, host, port):
+        """Take jobs from the broker until the connection closes"""
+        await send_line(writer, {'type': 'hello', 'name': self.name, 'slots': self.slots})
+        print(f"✅ Connected to broker at {host}:{port} with {self.slots} slots")
+
+        jobs = {}  # job id -> running task, ids are only unique per broker
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                message = json.loads(line)
+                if message['type'] == 'job':
+                    jobs[message['id']] = asyncio.create_task(self.run_job(writer, message, jobs))
+                elif message['type'] == 'cancel':
+                    task = jobs.get(message['id'])
+                    if task is not None:
+                        task.cancel()
+        finally:
+            for task in list(jobs.values()):
+                task.cancel()
+            writer.close()
+
+    async def connect(self, host, port, retry_delay):
+        """Serve one broker, reconnecting whenever its bot process restarts"""
+        while True:
+            try:
+                reader, writer = await asyncio.open_connection(host, port, limit=2 ** 24)
+            except OSError as e:
+                print(f"⏳ Broker at {host}:{port} unavailable ({e}), retrying...")
+                await asyncio.sleep(retry_delay)
+                continue
+
+            try:
+                await self.serve(reader, writer, host, port)
+            except (ConnectionError, ValueError) as e:
+                print(f"⚠️ Broker connection lost: {e}")
+            print(f"🔌 Disconnected from broker at {host}:{port}, reconnecting...")
+            await asyncio.sleep(retry_delay)
+
+    async def run(self, retry_delay=2.0):
+        """Connect to every broker and take jobs from all of them"""
+        await self.ollama.start()
+        health_task = asyncio.create_task(self.ollama.run_health_checks(OLLAMA_HEALTH_INTERVAL))
+        try:
+            await asyncio.gather(*(self.connect(host, port, retry_delay) for host, port in self.brokers))
+        finally:
+            health_task.cancel()
+            await self.ollama.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run Ollama generations for the bot in a separate process")
+    parser.add_argument('--address', default=WORKER_ADDRESS or '127.0.0.1:8770', help="Bot's worker broker address")
+    parser.add_argument('--brokers', type=int, default=1,
+                        help="Brokers on consecutive ports from --address, one per launcher.py process")
+    parser.add_argument('--slots', type=int, default=OLLAMA_PARALLEL, help="Jobs this worker runs at once")
+    parser.add_argument('--name', help="Name shown in !ollama_status")
+    args = parser.parse_args()
+
+    worker = GenerationWorker(broker_addresses(args.address, args.brokers), args.slots, args.name)
+    try:
+        asyncio.run(worker.run())
+    except KeyboardInterrupt:
+        print("\n🛑 Worker stopped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+"""
+Worker Pool - Broker that hands Ollama calls to separate worker processes
+"""
+import asyncio
+import json
+from ollama_client import OllamaError
+
+
+def parse_address(address):
+    """Split a "host:port" address, the port alone means localhost"""
+    host, _, port = address.rpartition(':')
+    return host or '127.0.0.1', int(port)
+
+
+def broker_addresses(address, count):
+    """Get count broker addresses on consecutive ports, as launcher.py assigns them"""
+    host, port = parse_address(address)
+    return [f"{host}:{port + index}" for index in range(count)]
+
+
+async def send_line(writer, data):
+    """Write one newline delimited JSON message"""
+    writer.write(json.dumps(data).encode('utf-8') + b'\n')
+    await writer.drain()
+
+
+class WorkerConnection:
+    def __init__(self, reader, writer, name, slots):
+        self.reader = reader
+        self.writer = writer
+        self.name = name
+        self.slots = slots  # Jobs the worker runs at once
+        self.jobs = {}  # job id -> queue of messages from the worker
+        self.completed = 0
+
+    @property
+    def load(self):
+        return len(self.jobs) / self.slots
+
+    def fail_jobs(self, error):
+        """Wake every waiting job with an error message"""
+        for queue in self.jobs.values():
+            queue.put_nowait({'type': 'error', 'error': error})
+
+
+class WorkerBroker:
+    def __init__(self, address, line_limit=2 ** 24, job_timeout=30.0):
+        self.host, self.port = parse_address(address)
+        self.line_limit = line_limit  # Largest message accepted from a worker
+        self.job_timeout = job_timeout  # Seconds to wait for a job's next message before giving up on the worker
+        self.workers = []
+        self.next_job_id = 0
+        self.server = None
+
+    @property
+    def available(self):
+        return bool(self.workers)
+
+    async def start(self):
+        """Listen for worker connections"""
+        self.server = await asyncio.start_server(self.handle_worker, self.host, self.port, limit=self.line_limit)
+        print(f"🧵 Worker broker listening on {self.host}:{self.port}")
+
+    async def close(self):
+        """Stop listening and disconnect every worker"""
+        if self.server is not None:
+            self.server.close()
+            for worker in list(self.workers):
+                worker.writer.close()
+            await self.server.wait_closed()
+            self.server = None
+
+    async def handle_worker(self, reader, writer):
+        """Register a worker and route its replies to the waiting jobs"""
+        peer = writer.get_extra_info('peername')
+        try:
+            hello = json.loads(await reader.readline())
+        except (ValueError, ConnectionError):
+            writer.close()
+            return
+
+        worker = WorkerConnection(reader, writer, hello.get('name') or str(peer), max(int(hello.get('slots', 1)), 1))
+        self.workers.append(worker)
+        print(f"🧵 Worker {worker.name} connected with {worker.slots} slots")
+
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                data = json.loads(line)
+                queue = worker.jobs.get(data.get('id'))
+                if queue is not None:
+                    queue.put_nowait(data)
+        except (ValueError, ConnectionError, asyncio.LimitOverrunError) as e:
+            print(f"⚠️ Worker {worker.name} sent a bad message: {e}")
+        finally:
+            self.workers.remove(worker)
+            worker.fail_jobs(f"Worker {worker.name} disconnected")
+            writer.close()
+            print(f"🧵 Worker {worker.name} disconnected")
+
+    def pick_worker(self):
+        """Choose the worker with the most free capacity"""
+        return min(self.workers, key=lambda worker: worker.load)
+
+    async def run(self, method, payload, route_key=None, model=None):
+        """Send a job to a worker and yield its messages until the result"""
+        if not self.workers:
+            raise OllamaError("No workers connected")
+
+        worker = self.pick_worker()
+        self.next_job_id += 1
+        job_id = self.next_job_id
+        queue = asyncio.Queue()
+        worker.jobs[job_id] = queue
+        finished = False
+
+        try:
+            await send_line(worker.writer, {
+                'type': 'job',
+                'id': job_id,
+                'method': method,
+                'payload': payload,
+                'route_key': route_key,
+                'model': model
+            })
+            while True:
+                try:
+                    # A stalled worker can keep its connection open, so don't wait on it forever
+                    data = await asyncio.wait_for(queue.get(), self.job_timeout)
+                except asyncio.TimeoutError:
+                    raise OllamaError(f"Worker {worker.name} sent nothing for {self.job_timeout:g}s")
+                if data['type'] == 'error':
+                    finished = True
+                    raise OllamaError(data['error'])
+                if data['type'] == 'result':
+                    finished = True
+                    worker.completed += 1
+                yield data
+                if finished:
+                    return
+        except ConnectionError as e:
+            raise OllamaError(f"Worker {worker.name} unreachable: {e}")
+        finally:
+            del worker.jobs[job_id]
+            if not finished and worker in self.workers:
+                # Abandoned mid-job, let the worker stop generating
+                try:
+                    await send_line(worker.writer, {'type': 'cancel', 'id': job_id})
+                except ConnectionError:
+                    pass
+
+    async def call(self, method, payload, route_key=None, model=None):
+        """Run a non-streaming job and return its response data"""
+        result = None
+        async for data in self.run(method, payload, route_key, model):
+            if data['type'] == 'result':
+                result = data['data']
+        return result
+
+    async def stream(self, method, payload, route_key=None, model=None):
+        """Run a streaming job, yielding each response chunk"""
+        async for data in self.run(method, payload, route_key, model):
+            if data['type'] == 'chunk':
+                yield data['data']
+
+    # Same call signatures as OllamaClient, so the bot can use either
+
+    async def generate(self, prompt, route_key=None, model=None):
+        """Run a non-streaming generation on a worker"""
+        return await self.call('generate', prompt, route_key, model)
+
+    async def stream_generate(self, prompt, route_key=None, model=None):
+        """Run a streaming generation on a worker"""
+        async for data in self.stream('stream_generate', prompt, route_key, model):
+            yield data
+
+    async def chat(self, messages, route_key=None, model=None):
+        """Run a non-streaming chat completion on a worker"""
+        return await self.call('chat', messages, route_key, model)
+
+    async def stream_chat(self, messages, route_key=None, model=None):
+        """Run a streaming chat completion on a worker"""
+        async for data in self.stream('stream_chat', messages, route_key, model):
+            yield data
+
+    def status(self):
+        """Get a summary of each connected worker for status displays"""
+        return [{
+            'name': worker.name,
+            'slots': worker.slots,
+            'active': len(worker.jobs),
+            'completed': worker.completed
+        } for worker in self.workers]